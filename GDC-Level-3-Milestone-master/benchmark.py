@@ -0,0 +1,89 @@
+import contextlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from solve_me import TasksCommand
+
+
+def recursive_add(items, priority, task):
+    # The cascade `TasksCommand.add` used before the priority index, kept for comparison.
+    if priority in items.keys():
+        recursive_add(items, priority + 1, items.pop(priority))
+    items[priority] = task
+
+
+def benchmark_cascade(size=50000):
+    command_object = TasksCommand()
+    items = {}
+    for priority in range(1, size + 1):
+        command_object.current_items[priority] = f"Task {priority}"
+        items[priority] = f"Task {priority}"
+
+    start = time.perf_counter()
+    command_object.add_item(1, "Urgent task")
+    print(
+        f"Priority index: inserted at 1 into {size} tasks in {time.perf_counter() - start:.4f}s"
+    )
+
+    start = time.perf_counter()
+    try:
+        recursive_add(items, 1, "Urgent task")
+        print(
+            f"Recursive: inserted at 1 into {size} tasks in {time.perf_counter() - start:.4f}s"
+        )
+    except RecursionError:
+        print(f"Recursive: hit the recursion limit inserting at 1 into {size} tasks")
+
+
+def contention_worker(storage, worker, workers, operations):
+    TasksCommand.STORAGE = storage
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for index in range(operations):
+            priority = index * workers + worker + 1
+            TasksCommand().run("add", [str(priority), f"Task {priority}"])
+
+
+def benchmark_contention(operations=200):
+    cwd = os.getcwd()
+    for storage in ["text", "journal"]:
+        for workers in [1, 2, 4, 8]:
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                try:
+                    processes = [
+                        multiprocessing.Process(
+                            target=contention_worker,
+                            args=(storage, worker, workers, operations),
+                        )
+                        for worker in range(workers)
+                    ]
+                    start = time.perf_counter()
+                    for process in processes:
+                        process.start()
+                    for process in processes:
+                        process.join()
+                    elapsed = time.perf_counter() - start
+                    TasksCommand.STORAGE = storage
+                    command_object = TasksCommand()
+                    command_object.read_current()
+                    total = workers * operations
+                    lost = total - len(command_object.current_items)
+                    print(
+                        f"Contention ({storage}): {workers} writers, {total / elapsed:.0f} adds/s, {lost} lost updates"
+                    )
+                finally:
+                    os.chdir(cwd)
+
+
+BENCHMARKS = {
+    "cascade": benchmark_cascade,
+    "contention": benchmark_contention,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS.keys():
+        BENCHMARKS[name]()
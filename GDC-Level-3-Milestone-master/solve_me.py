@@ -1,56 +1,448 @@
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import urllib.parse as parse
 import json
+import mmap
+import os
+import selectors
+import shlex
+import socket
+import struct
+import sys
+import threading
+import time
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where tasks are not locked.
+    fcntl = None
 
-class TasksCommand:
-    TASKS_FILE = "tasks.txt"
-    COMPLETED_TASKS_FILE = "completed.txt"
 
-    current_items = {}
-    completed_items = []
+def write_atomically(path, chunks, mode="w"):
+    # Readers see either the old or the new file, never a partially written one.
+    temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_file, mode) as file:
+            file.writelines(chunks)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+class BinaryTaskFile:
+    # Layout: a header with the record count, then a (key, offset) entry per record
+    # sorted by key, then the records as length-prefixed UTF-8 strings.
+    MAGIC = b"TASKBIN1"
+    HEADER = struct.Struct("<8sQ")
+    ENTRY = struct.Struct("<qQ")
+    LENGTH = struct.Struct("<I")
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a binary task file")
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.entry(index)[0], self.text(index)
+
+    def entry(self, index):
+        offset = self.HEADER.size + index * self.ENTRY.size
+        return self.ENTRY.unpack_from(self.map, offset)
+
+    def text(self, index):
+        offset = self.entry(index)[1]
+        (length,) = self.LENGTH.unpack_from(self.map, offset)
+        start = offset + self.LENGTH.size
+        return self.map[start : start + length].decode()
+
+    def keys(self):
+        start = self.HEADER.size
+        end = start + self.count * self.ENTRY.size
+        return [key for key, _ in self.ENTRY.iter_unpack(self.map[start:end])]
+
+    def find(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.entry(low)[0] == key:
+            return self.text(low)
+        raise KeyError(key)
+
+    @classmethod
+    def write(cls, path, items):
+        records = [(key, text.encode()) for key, text in items]
+        chunks = [cls.HEADER.pack(cls.MAGIC, len(records))]
+        offset = cls.HEADER.size + len(records) * cls.ENTRY.size
+        for key, record in records:
+            chunks.append(cls.ENTRY.pack(key, offset))
+            offset += cls.LENGTH.size + len(record)
+        for key, record in records:
+            chunks.append(cls.LENGTH.pack(len(record)) + record)
+        write_atomically(path, chunks, "wb")
+
+
+class PriorityIndex(MutableMapping):
+    def __init__(self):
+        self.priorities = []
+        self.tasks = {}
+        self.source = None
+
+    def load(self, source):
+        # Only the priorities are read up front, tasks are decoded from the
+        # source on first access. `tasks` takes precedence over the source.
+        self.priorities = source.keys()
+        self.tasks = {}
+        self.source = source
+
+    def __getitem__(self, priority):
+        if priority not in self.tasks:
+            if self.source is None or priority not in self:
+                raise KeyError(priority)
+            self.tasks[priority] = self.source.find(priority)
+        return self.tasks[priority]
+
+    def __setitem__(self, priority, task):
+        if priority not in self:
+            insort(self.priorities, priority)
+        self.tasks[priority] = task
+
+    def __delitem__(self, priority):
+        if priority not in self:
+            raise KeyError(priority)
+        self.tasks.pop(priority, None)
+        del self.priorities[bisect_left(self.priorities, priority)]
+
+    def __contains__(self, priority):
+        if self.source is None:
+            return priority in self.tasks
+        index = bisect_left(self.priorities, priority)
+        return index < len(self.priorities) and self.priorities[index] == priority
+
+    def __iter__(self):
+        return iter(self.priorities)
+
+    def __len__(self):
+        return len(self.priorities)
+
+    def items_at(self, offset, limit=None):
+        end = len(self.priorities) if limit is None else offset + limit
+        for key in self.priorities[offset:end]:
+            yield key, self[key]
+
+    def items_from(self, priority, limit=None):
+        start = bisect_left(self.priorities, priority)
+        end = len(self.priorities) if limit is None else start + limit
+        for key in self.priorities[start:end]:
+            yield key, self[key]
+
+    def insert(self, priority, task):
+        start = bisect_left(self.priorities, priority)
+        if start == len(self.priorities) or self.priorities[start] != priority:
+            self.priorities.insert(start, priority)
+            self.tasks[priority] = task
+            return
+        # Priorities are distinct integers, so `priorities[i] - i` never decreases
+        # and stays constant exactly over the consecutive run starting at `start`.
+        offset = priority - start
+        low, high = start, len(self.priorities)
+        while low < high:
+            middle = (low + high) // 2
+            if self.priorities[middle] - middle == offset:
+                low = middle + 1
+            else:
+                high = middle
+        for index in range(low - 1, start - 1, -1):
+            shifted = self.priorities[index]
+            self.tasks[shifted + 1] = self[shifted]
+            self.priorities[index] = shifted + 1
+        self.priorities.insert(start, priority)
+        self.tasks[priority] = task
+
+
+class CompletedList(Sequence):
+    def __init__(self, source):
+        # Completed tasks are decoded from the source on access. Tasks are only
+        # ever appended to the list, and those are kept in `appended`.
+        self.source = source
+        self.appended = []
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index < len(self.source):
+            return self.source.text(index)
+        return self.appended[index - len(self.source)]
+
+    def __len__(self):
+        return len(self.source) + len(self.appended)
+
+    def append(self, task):
+        self.appended.append(task)
+
+
+class TextFileStorage:
+    def __init__(self, command):
+        self.command = command
+        self.dirty = set()
 
     def read_current(self):
         try:
-            file = open(self.TASKS_FILE, "r")
+            file = open(self.command.TASKS_FILE, "r")
             for line in file.readlines():
-                item = line[:-1].split(" ")
-                self.current_items[int(item[0])] = " ".join(item[1:])
+                item = line.rstrip("\n").split(" ")
+                self.command.current_items[int(item[0])] = " ".join(item[1:])
             file.close()
         except Exception:
             pass
 
     def read_completed(self):
         try:
-            file = open(self.COMPLETED_TASKS_FILE, "r")
-            self.completed_items = file.readlines()
+            file = open(self.command.COMPLETED_TASKS_FILE, "r")
+            self.command.completed_items = [
+                line.rstrip("\n") for line in file.readlines()
+            ]
             file.close()
         except Exception:
             pass
 
     def write_current(self):
-        with open(self.TASKS_FILE, "w+") as f:
-            f.truncate(0)
-            for key in sorted(self.current_items.keys()):
-                f.write(f"{key} {self.current_items[key]}\n")
+        items = self.command.current_items.items()
+        write_atomically(
+            self.command.TASKS_FILE, (f"{key} {task}\n" for key, task in items)
+        )
+
+    def write_completed(self):
+        write_atomically(
+            self.command.COMPLETED_TASKS_FILE,
+            (f"{item}\n" for item in self.command.completed_items),
+        )
+
+    def paths(self):
+        return [self.command.TASKS_FILE, self.command.COMPLETED_TASKS_FILE]
+
+    def save(self):
+        self.write_current()
+        self.write_completed()
+
+    def log(self, op, *args):
+        self.dirty.add("current")
+        if op == "done":
+            self.dirty.add("completed")
+
+    def flush(self):
+        if "current" in self.dirty:
+            self.write_current()
+        if "completed" in self.dirty:
+            self.write_completed()
+        self.dirty.clear()
+
+
+# Append-only log of add/done/delete records on top of a snapshot of the items.
+# Records are buffered until flush and written with a single fsync, and the
+# journal is rewritten as a fresh snapshot once the records outnumber the items.
+class JournalStorage:
+    COMPACT_THRESHOLD = 1000
+
+    def __init__(self, command):
+        self.command = command
+        self.pending = []
+        self.records = 0
+        self.loaded = False
+
+    def read_current(self):
+        self.replay()
+
+    def read_completed(self):
+        self.replay()
+
+    def replay(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        if not os.path.exists(self.command.JOURNAL_FILE):
+            # Migrate an existing plain text store into the first snapshot.
+            TextFileStorage(self.command).read_current()
+            TextFileStorage(self.command).read_completed()
+            if self.command.current_items or self.command.completed_items:
+                self.compact()
+            return
+        offset = 0
+        with open(self.command.JOURNAL_FILE, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if line.startswith(b"["):
+                    op, *args = json.loads(line)
+                else:  # Written before records were JSON encoded.
+                    op, *args = line[:-1].decode().split(" ")
+                if op == "pending":
+                    self.command.current_items[int(args[0])] = " ".join(args[1:])
+                elif op == "completed":
+                    self.command.completed_items.append(" ".join(args))
+                else:
+                    self.command.apply(op, args)
+                    self.records += 1
+        if offset != os.path.getsize(self.command.JOURNAL_FILE):
+            # Drop the torn record left behind by an interrupted append.
+            os.truncate(self.command.JOURNAL_FILE, offset)
+
+    def paths(self):
+        return [self.command.JOURNAL_FILE]
+
+    def save(self):
+        self.pending.clear()
+        self.compact()
+
+    def log(self, op, *args):
+        # JSON escapes line breaks, so task text can't split or inject records.
+        self.pending.append(json.dumps([op, *args]) + "\n")
+
+    def flush(self):
+        if not self.pending:
+            return
+        with open(self.command.JOURNAL_FILE, "a") as file:
+            file.write("".join(self.pending))
+            file.flush()
+            os.fsync(file.fileno())
+        self.records += len(self.pending)
+        self.pending.clear()
+        live = len(self.command.current_items) + len(self.command.completed_items)
+        if self.loaded and self.records >= max(self.COMPACT_THRESHOLD, live):
+            self.compact()
+
+    def snapshot(self):
+        for key, task in self.command.current_items.items():
+            yield json.dumps(["pending", key, task]) + "\n"
+        for item in self.command.completed_items:
+            yield json.dumps(["completed", item]) + "\n"
+
+    def compact(self):
+        write_atomically(self.command.JOURNAL_FILE, self.snapshot())
+        self.records = 0
+
+
+class BinaryFileStorage(TextFileStorage):
+    def read_current(self):
+        try:
+            source = BinaryTaskFile(self.command.TASKS_BINARY_FILE)
+        except FileNotFoundError:
+            return
+        self.command.current_items.load(source)
+
+    def read_completed(self):
+        try:
+            source = BinaryTaskFile(self.command.COMPLETED_TASKS_BINARY_FILE)
+        except FileNotFoundError:
+            return
+        self.command.completed_items = CompletedList(source)
+
+    def write_current(self):
+        BinaryTaskFile.write(
+            self.command.TASKS_BINARY_FILE, self.command.current_items.items()
+        )
 
     def write_completed(self):
-        with open(self.COMPLETED_TASKS_FILE, "w+") as f:
-            f.truncate(0)
-            for item in self.completed_items:
-                f.write(f"{item}\n")
-
-    def runserver(self):
-        address = "127.0.0.1"
-        port = 8000
+        BinaryTaskFile.write(
+            self.command.COMPLETED_TASKS_BINARY_FILE,
+            enumerate(self.command.completed_items),
+        )
+
+    def paths(self):
+        return [
+            self.command.TASKS_BINARY_FILE,
+            self.command.COMPLETED_TASKS_BINARY_FILE,
+        ]
+
+
+STORAGE_BACKENDS = {
+    "text": TextFileStorage,
+    "journal": JournalStorage,
+    "binary": BinaryFileStorage,
+}
+
+
+class TasksCommand:
+    TASKS_FILE = "tasks.txt"
+    COMPLETED_TASKS_FILE = "completed.txt"
+    JOURNAL_FILE = "tasks.journal"
+    LOCK_FILE = "tasks.lock"
+    TASKS_BINARY_FILE = "tasks.bin"
+    COMPLETED_TASKS_BINARY_FILE = "completed.bin"
+
+    STORAGE = os.environ.get("TASKS_STORAGE", "text")
+
+    def __init__(self, *args, **kwargs):
+        self.current_items = PriorityIndex()
+        self.completed_items = []
+        self.storage = STORAGE_BACKENDS[self.STORAGE](self)
+        super().__init__(*args, **kwargs)
+
+    def read_current(self):
+        self.storage.read_current()
+
+    def read_completed(self):
+        self.storage.read_completed()
+
+    def parse_options(self, args):
+        options = {}
+        for index, arg in enumerate(args or []):
+            if arg.startswith("--") and index + 1 < len(args):
+                options[arg[2:]] = args[index + 1]
+        return options
+
+    def runserver(self, args=None):
+        options = self.parse_options(args)
+        address = options.get("bind", "127.0.0.1")
+        port = int(options.get("port", 8000))
+        workers = int(options.get("workers", 4))
         server_address = (address, port)
-        httpd = HTTPServer(server_address, TasksServer)
-        print(f"Started HTTP Server on http://{address}:{port}")
+        httpd = PooledHTTPServer(server_address, TasksServer, workers)
+        print(f"Started HTTP Server on http://{address}:{port} with {workers} workers")
         httpd.serve_forever()
 
+    @classmethod
+    @contextmanager
+    def file_lock(cls, exclusive=True):
+        # Advisory lock shared by every process working on the same task files.
+        if fcntl is None:
+            yield
+            return
+        with open(cls.LOCK_FILE, "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
     def run(self, command, args):
-        self.read_current()
-        self.read_completed()
+        if command == "runserver":
+            self.runserver(args)
+            return
+        with self.file_lock(exclusive=command not in ("ls", "report", "help")):
+            self.read_current()
+            self.read_completed()
+            self.execute(command, args)
+
+    def execute(self, command, args):
         if command == "add":
             self.add(args)
         elif command == "done":
@@ -58,11 +450,15 @@ class TasksCommand:
         elif command == "delete":
             self.delete(args)
         elif command == "ls":
-            self.ls()
+            self.ls(args)
         elif command == "report":
-            self.report()
+            self.report(args)
+        elif command == "batch":
+            self.batch(args)
+        elif command == "convert":
+            self.convert(args)
         elif command == "runserver":
-            self.runserver()
+            self.runserver(args)
         elif command == "help":
             self.help()
 
@@ -71,56 +467,140 @@ class TasksCommand:
             """Usage :-
 $ python tasks.py add 2 hello world # Add a new item with priority 2 and text "hello world" to the list
 $ python tasks.py ls # Show incomplete priority list items sorted by priority in ascending order
+$ python tasks.py ls --page 2 --limit 20 # Show the second page of 20 incomplete items, also works with report
 $ python tasks.py del PRIORITY_NUMBER # Delete the incomplete item with the given priority number
 $ python tasks.py done PRIORITY_NUMBER # Mark the incomplete item with the given PRIORITY_NUMBER as complete
 $ python tasks.py help # Show usage
 $ python tasks.py report # Statistics
-$ python tasks.py runserver # Starts the tasks management server"""
+$ python tasks.py convert text binary # Convert the tasks stored by one storage backend (text, journal or binary) to another
+$ python tasks.py batch [FILE] # Apply add/done/delete operations read line by line from FILE or stdin, saving once at the end
+$ python tasks.py runserver # Starts the tasks management server
+$ python tasks.py runserver --bind 0.0.0.0 --port 8080 --workers 8 # Starts the server on the given address with 8 worker threads"""
         )
 
+    def apply(self, op, args):
+        if op == "add":
+            self.add_item(int(args[0]), " ".join(args[1:]))
+        elif op == "done":
+            self.done_item(int(args[0]))
+        elif op == "delete":
+            self.delete_item(int(args[0]))
+
+    def add_item(self, priority, task):
+        self.current_items.insert(priority, task)
+
+    def done_item(self, priority):
+        item = self.current_items.pop(priority, None)
+        if item:
+            self.completed_items.append(item)
+        return item
+
+    def delete_item(self, priority):
+        return self.current_items.pop(priority, None)
+
     def add(self, args, flush=True):
         priority = int(args[0])
         task = " ".join(args[1:])
-        if priority in self.current_items.keys():
-            self.add([priority + 1, self.current_items.pop(priority)], flush=False)
-        self.current_items[priority] = task
+        if "\n" in task or "\r" in task:
+            print("Error: task can't contain line breaks. Nothing added.")
+            return
+        self.add_item(priority, task)
+        self.storage.log("add", priority, task)
         if flush:
-            self.write_current()
-            print(f'Added task: "{task}" with priority {priority}')
+            self.storage.flush()
+        print(f'Added task: "{task}" with priority {priority}')
 
-    def done(self, args):
+    def done(self, args, flush=True):
         priority = int(args[0])
-        item = self.current_items.pop(priority, None)
-        if item:
-            self.completed_items.append(item)
-            self.write_current()
-            self.write_completed()
+        if self.done_item(priority):
+            self.storage.log("done", priority)
+            if flush:
+                self.storage.flush()
             print("Marked item as done.")
         else:
             print(f"Error: no incomplete item with priority {priority} exists.")
 
-    def delete(self, args):
+    def delete(self, args, flush=True):
         priority = int(args[0])
-        if self.current_items.pop(priority, None):
-            self.write_current()
+        if self.delete_item(priority):
+            self.storage.log("delete", priority)
+            if flush:
+                self.storage.flush()
             print(f"Deleted item with priority {priority}")
         else:
             print(
                 f"Error: item with priority {priority} does not exist. Nothing deleted."
             )
 
-    def ls(self):
-        self.current_items = dict(sorted(self.current_items.items()))
-        for index, (priority, item) in enumerate(self.current_items.items()):
-            print(f"{index + 1}. {item} [{priority}]")
+    def batch(self, args):
+        file = open(args[0], "r") if args else sys.stdin
+        try:
+            for line_number, line in enumerate(file, start=1):
+                try:
+                    op, *op_args = shlex.split(line, comments=True) or [None]
+                    if op in ("add", "done", "delete"):
+                        getattr(self, op)(op_args, flush=False)
+                    elif op is not None:
+                        print(f"Error: line {line_number}: unknown operation {op}")
+                except (IndexError, ValueError) as e:
+                    print(f"Error: line {line_number}: {e}")
+        finally:
+            if file is not sys.stdin:
+                file.close()
+            # Keeps the operations applied before an interruption.
+            self.storage.flush()
+
+    def convert(self, args):
+        source, target = args
+        self.current_items = PriorityIndex()
+        self.completed_items = []
+        self.storage = STORAGE_BACKENDS[source](self)
+        self.read_current()
+        self.read_completed()
+        STORAGE_BACKENDS[target](self).save()
+        print(
+            f"Converted {len(self.current_items)} pending and {len(self.completed_items)} completed tasks from {source} to {target} storage"
+        )
+
+    def page_options(self, args):
+        # Pages start at 1 and hold at least one task, as on the server.
+        options = self.parse_options(args)
+        try:
+            limit = int(options["limit"]) if "limit" in options else None
+            page = int(options.get("page", 1))
+        except ValueError:
+            limit = page = 0
+        if (
+            page < 1
+            or (limit is not None and limit < 1)
+            or ("page" in options and limit is None)
+        ):
+            print("Error: usage is --limit N [--page N], with numbers from 1.")
+            return None
+        return (page - 1) * (limit or 0), limit
+
+    def ls(self, args=None):
+        options = self.page_options(args)
+        if options is None:
+            return
+        offset, limit = options
+        items = self.current_items.items_at(offset, limit)
+        for index, (priority, item) in enumerate(items, start=offset + 1):
+            print(f"{index}. {item} [{priority}]")
 
-    def report(self):
+    def report(self, args=None):
+        options = self.page_options(args)
+        if options is None:
+            return
+        offset, limit = options
         print(f"Pending : {len(self.current_items)}")
-        self.ls()
+        self.ls(args)
         print()
         print(f"Completed : {len(self.completed_items)}")
-        for index, item in enumerate(self.completed_items):
-            print(f"{index + 1}. {item}")
+        end = None if limit is None else offset + limit
+        items = self.completed_items[offset:end]
+        for index, item in enumerate(items, start=offset + 1):
+            print(f"{index}. {item}")
 
     def render_add_task(self):
         content = f"""
@@ -154,15 +634,16 @@ $ python tasks.py runserver # Starts the tasks management server"""
         return self.render_page_from_template("Add new task", content)
 
     def render_pending_tasks(self):
-        subcontent = "<h6>Hooray! You've no tasks pending!</h6>"
-        if len(self.current_items) != 0:
-            subcontent = "".join(
-                [
-                    self.render_pending_task_tile(*task)
-                    for task in self.current_items.items()
-                ]
-            )
-        content = f"""
+        return "".join(self.stream_pending_tasks())
+
+    def stream_pending_tasks(self, items=None, next_page=None):
+        items = self.current_items.items() if items is None else items
+        return self.stream_page_from_template(
+            "Pending Tasks", self.stream_pending_content(items, next_page)
+        )
+
+    def stream_pending_content(self, items, next_page=None):
+        yield """
         <div class="flex items-center justify-center py-6">
             <button class="relative inline-flex items-center justify-center p-0.5 mb-2 mr-2 overflow-hidden text-sm font-medium text-gray-900 rounded-lg group bg-gradient-to-br from-purple-600 to-blue-500 group-hover:from-purple-600 group-hover:to-blue-500 hover:text-white dark:text-white focus:ring-4 focus:ring-blue-300 dark:focus:ring-blue-800">
                 <span class="relative px-5 py-2.5 transition-all ease-in duration-75 bg-white dark:bg-gray-900 rounded-md group-hover:bg-opacity-0" onclick="location.href='/completed'">
@@ -178,17 +659,29 @@ $ python tasks.py runserver # Starts the tasks management server"""
             </button>
         </div>
         <div class="flex items-center justify-center py-6">
-            <div class="grid xl:grid-cols-4 lg:grid-cols-3 md:grid-cols-2 grid-cols-1 gap-4 text-slate-200">{subcontent}</div>
+            <div class="grid xl:grid-cols-4 lg:grid-cols-3 md:grid-cols-2 grid-cols-1 gap-4 text-slate-200">"""
+        empty = True
+        for task in items:
+            empty = False
+            yield self.render_pending_task_tile(*task)
+        if empty:
+            yield "<h6>Hooray! You've no tasks pending!</h6>"
+        yield """</div>
         </div>"""
-        return self.render_page_from_template("Pending Tasks", content)
+        if next_page:
+            yield self.render_next_page_button(next_page)
 
     def render_completed_tasks(self):
-        subcontent = "<h6>You haven't completed any tasks yet :(</h6>"
-        if len(self.completed_items) != 0:
-            subcontent = "".join(
-                [self.render_completed_task_tile(task) for task in self.completed_items]
-            )
-        content = f"""
+        return "".join(self.stream_completed_tasks())
+
+    def stream_completed_tasks(self, items=None, next_page=None):
+        items = self.completed_items if items is None else items
+        return self.stream_page_from_template(
+            "Completed Tasks", self.stream_completed_content(items, next_page)
+        )
+
+    def stream_completed_content(self, items, next_page=None):
+        yield """
         <div class="flex items-center justify-center py-6">
             <button class="relative inline-flex items-center justify-center p-0.5 mb-2 mr-2 overflow-hidden text-sm font-medium text-gray-900 rounded-lg group bg-gradient-to-br from-purple-600 to-blue-500 group-hover:from-purple-600 group-hover:to-blue-500 hover:text-white dark:text-white focus:ring-4 focus:ring-blue-300 dark:focus:ring-blue-800">
                 <span class="relative px-5 py-2.5 transition-all ease-in duration-75 bg-white dark:bg-gray-900 rounded-md group-hover:bg-opacity-0" onclick="location.href='/tasks'">
@@ -197,12 +690,23 @@ $ python tasks.py runserver # Starts the tasks management server"""
             </button>
         </div>
         <div class="flex items-center justify-center py-6">
-            <div class="grid grid-cols-1 gap-2 text-slate-200">{subcontent}</div>
+            <div class="grid grid-cols-1 gap-2 text-slate-200">"""
+        empty = True
+        for task in items:
+            empty = False
+            yield self.render_completed_task_tile(task)
+        if empty:
+            yield "<h6>You haven't completed any tasks yet :(</h6>"
+        yield """</div>
         </div>"""
-        return self.render_page_from_template("Completed Tasks", content)
+        if next_page:
+            yield self.render_next_page_button(next_page)
 
     def render_page_from_template(self, page_title, content):
-        return f"""
+        return "".join(self.stream_page_from_template(page_title, [content]))
+
+    def stream_page_from_template(self, page_title, content):
+        yield f"""
         <html>
             <head>
                 <script src="https://cdn.tailwindcss.com"></script>
@@ -215,7 +719,9 @@ $ python tasks.py runserver # Starts the tasks management server"""
                             {page_title}
                         </h2>
                     </div>
-                    {content}
+                    """
+        yield from content
+        yield """
                 </div>
             </body>
         </html>
@@ -246,6 +752,18 @@ $ python tasks.py runserver # Starts the tasks management server"""
   </div>
 </div>"""
 
+    def render_next_page_button(self, location):
+        return f"""
+        <div class="flex items-center justify-center py-6">
+            <button 
+                type="button" 
+                class="text-white bg-gradient-to-br from-purple-600 to-blue-500 hover:bg-gradient-to-bl focus:ring-4 focus:ring-blue-300 dark:focus:ring-blue-800 font-medium rounded-lg text-sm px-5 py-2.5 text-center mr-2 mb-2"
+                onclick="location.href='{location}'"
+            >
+                Next page
+            </button>
+        </div>"""
+
     def render_completed_task_tile(self, task_description):
         return f"""
         <div class="text-white bg-green-700 hover:bg-green-800 focus:ring-4 focus:ring-green-300 font-medium rounded-full text-sm px-5 py-2.5 text-center mr-2 mb-2 dark:bg-green-600 dark:hover:bg-green-700 dark:focus:ring-green-800">
@@ -253,43 +771,268 @@ $ python tasks.py runserver # Starts the tasks management server"""
         </div>"""
 
 
+class TaskStore:
+    def __init__(self):
+        self.command = None
+        self.signature = None
+        self.lock = threading.RLock()
+
+    def stat(self, command):
+        signature = []
+        for path in command.storage.paths():
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def stale(self):
+        # True when the files were changed by someone else, e.g. the CLI.
+        return self.command is None or self.stat(self.command) != self.signature
+
+    def reload(self):
+        self.command = TasksCommand()
+        self.command.read_current()
+        self.command.read_completed()
+        self.signature = self.stat(self.command)
+
+    def load(self):
+        with self.lock:
+            if self.stale():
+                with TasksCommand.file_lock(exclusive=False):
+                    self.reload()
+            return self.command
+
+    def run(self, command, args):
+        with self.lock, TasksCommand.file_lock():
+            if self.stale():
+                self.reload()
+            self.command.execute(command, args)
+            self.signature = self.stat(self.command)
+
+
+class PooledHTTPServer(HTTPServer):
+    # Workers only serve requests. A keep-alive connection waiting for its next
+    # request is parked with a selector instead, so idle clients hold a socket
+    # rather than a worker, and it goes back to the pool once it is readable.
+    keep_alive_timeout = 15
+
+    def __init__(self, server_address, handler_class, workers):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.selector = selectors.DefaultSelector()
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        self.arrivals = []
+        self.arrivals_lock = threading.Lock()
+        self.closing = False
+        super().__init__(server_address, handler_class)
+        self.watcher = threading.Thread(target=self.watch_parked, daemon=True)
+        self.watcher.start()
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        self.release(handler)
+
+    def resume(self, handler):
+        try:
+            handler.handle()
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+            handler.keep_alive = False
+        self.release(handler)
+
+    def release(self, handler):
+        if getattr(handler, "keep_alive", False):
+            self.park(handler)
+        else:
+            handler.finish()
+            self.shutdown_request(handler.request)
+
+    def park(self, handler):
+        # The selector is only touched by the watcher thread.
+        with self.arrivals_lock:
+            self.arrivals.append(handler)
+        self.wakeup_writer.send(b"\0")
+
+    def watch_parked(self):
+        deadlines = {}
+        while not self.closing:
+            for key, _ in self.selector.select(timeout=1):
+                if key.fileobj is self.wakeup_reader:
+                    self.wakeup_reader.recv(4096)
+                    with self.arrivals_lock:
+                        arrivals, self.arrivals = self.arrivals, []
+                    for handler in arrivals:
+                        self.selector.register(
+                            handler.request, selectors.EVENT_READ, handler
+                        )
+                        deadlines[handler] = time.monotonic() + self.keep_alive_timeout
+                else:
+                    self.selector.unregister(key.fileobj)
+                    del deadlines[key.data]
+                    self.executor.submit(self.resume, key.data)
+            now = time.monotonic()
+            for handler, deadline in list(deadlines.items()):
+                if deadline <= now or self.closing:
+                    self.selector.unregister(handler.request)
+                    del deadlines[handler]
+                    handler.keep_alive = False
+                    self.release(handler)
+
+    def server_close(self):
+        super().server_close()
+        self.closing = True
+        self.wakeup_writer.send(b"\0")
+        self.watcher.join()
+        self.executor.shutdown(wait=False)
+
+
 class TasksServer(TasksCommand, BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Seconds a client has to send the rest of a request once it started.
+    timeout = 5
+    keep_alive = False
+
+    task_store = TaskStore()
+
+    # Rendered chunks are coalesced into HTTP chunks of about this many bytes.
+    CHUNK_SIZE = 16 * 1024
+
     def do_GET(self):
-        task_command_object = TasksCommand()
+        # Snapshot what to render while holding the store lock, but render and
+        # write to the socket after releasing it so that a slow client only
+        # holds up its own worker.
+        try:
+            with self.task_store.lock:
+                content = self.render_path(self.task_store.load())
+        except ValueError:  # A parameter that should be an integer isn't.
+            self.send_empty_response(400)
+            return
+        if content is None:
+            self.send_empty_response(404)
+            return
+        self.send_response(200)
+        self.send_header("content-type", "text/html")
+        if self.request_version == "HTTP/1.0":
+            body = "".join(content).encode()
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        buffer = []
+        size = 0
+        for chunk in content:
+            buffer.append(chunk.encode())
+            size += len(buffer[-1])
+            if size >= self.CHUNK_SIZE:
+                self.write_chunk(b"".join(buffer))
+                buffer.clear()
+                size = 0
+        if buffer:
+            self.write_chunk(b"".join(buffer))
+        self.write_chunk(b"")
+
+    def handle(self):
+        if not isinstance(self.server, PooledHTTPServer):
+            super().handle()
+            return
+        # Serves the request, and any the client already pipelined behind it,
+        # then leaves the connection to the server to park until the next one.
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.has_buffered_request():
+            self.handle_one_request()
+        self.keep_alive = not self.close_connection
+
+    def has_buffered_request(self):
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def finish(self):
+        if self.keep_alive:
+            self.wfile.flush()
+        else:
+            super().finish()
+
+    def send_empty_response(self, code):
+        self.send_response(code)
+        self.send_header("content-length", "0")
+        self.end_headers()
 
-        # TODO: ignore reading from volume on every request.
-        task_command_object.read_current()
-        task_command_object.read_completed()
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
 
-        if self.path == "/tasks":
-            content = task_command_object.render_pending_tasks()
-        elif self.path == "/completed":
-            content = task_command_object.render_completed_tasks()
+    def render_path(self, task_command_object):
+        url = parse.urlsplit(self.path)
+        if url.path == "/tasks":
+            params = dict(parse.parse_qsl(url.query))
+            return self.stream_pending_page(task_command_object, params)
+        elif url.path == "/completed":
+            params = dict(parse.parse_qsl(url.query))
+            return self.stream_completed_page(task_command_object, params)
         elif self.path.startswith("/add"):
             params = dict(parse.parse_qsl(parse.urlsplit(self.path).query))
             if {"task", "priority"} <= params.keys():
-                task_command_object.run("add", [params["priority"], params["task"]])
-                content = self.redirect_to("/tasks")
-            else:
-                content = task_command_object.render_add_task()
+                self.task_store.run("add", [params["priority"], params["task"]])
+                return [self.redirect_to("/tasks")]
+            return [task_command_object.render_add_task()]
         elif self.path.startswith("/done"):
             params = dict(parse.parse_qsl(parse.urlsplit(self.path).query))
             if {"priority"} <= params.keys():
-                task_command_object.run("done", [params["priority"]])
-            content = self.redirect_to("/tasks")
+                self.task_store.run("done", [params["priority"]])
+            return [self.redirect_to("/tasks")]
         elif self.path.startswith("/delete"):
             params = dict(parse.parse_qsl(parse.urlsplit(self.path).query))
             if {"priority"} <= params.keys():
-                task_command_object.run("delete", [params["priority"]])
-            content = self.redirect_to("/tasks")
+                self.task_store.run("delete", [params["priority"]])
+            return [self.redirect_to("/tasks")]
+        return None
+
+    def stream_pending_page(self, task_command_object, params):
+        # `after` resumes from the last priority of the previous page, `offset`
+        # jumps to a position; both only touch the items on the requested page.
+        limit = self.page_limit(params)
+        fetch = None if limit is None else limit + 1
+        if "after" in params:
+            after = int(params["after"]) + 1
+            items = list(task_command_object.current_items.items_from(after, fetch))
         else:
-            self.send_response(404)
-            self.end_headers()
-            return
-        self.send_response(200)
-        self.send_header("content-type", "text/html")
-        self.end_headers()
-        self.wfile.write(content.encode())
+            offset = max(0, int(params.get("offset", 0)))
+            items = list(task_command_object.current_items.items_at(offset, fetch))
+        next_page = None
+        if limit is not None and len(items) > limit:
+            items = items[:limit]
+            next_page = f"/tasks?after={items[-1][0]}&limit={limit}"
+        return task_command_object.stream_pending_tasks(items, next_page)
+
+    def stream_completed_page(self, task_command_object, params):
+        limit = self.page_limit(params)
+        offset = max(0, int(params.get("offset", 0)))
+        end = None if limit is None else offset + limit
+        items = task_command_object.completed_items[offset:end]
+        next_page = None
+        if end is not None and end < len(task_command_object.completed_items):
+            next_page = f"/completed?offset={end}&limit={limit}"
+        return task_command_object.stream_completed_tasks(items, next_page)
+
+    def page_limit(self, params):
+        return max(1, int(params["limit"])) if "limit" in params else None
 
     def redirect_to(self, location):
         return f"""<script type="text/javascript">window.location.href = "{location}"</script>"""
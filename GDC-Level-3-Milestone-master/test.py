@@ -1,22 +1,40 @@
+import contextlib
+import http.client
+import io
+import json
 import os
 import random
 import string
+import threading
 import unittest
+from unittest import mock
 
-from solve_me import TasksCommand, TasksServer
+from solve_me import (
+    BinaryFileStorage,
+    JournalStorage,
+    PooledHTTPServer,
+    PriorityIndex,
+    TasksCommand,
+    TaskStore,
+    TasksServer,
+    write_atomically,
+)
 
 random_choices = string.ascii_uppercase + string.digits + string.ascii_lowercase
 
 
 def reset_files():
-    try:
-        os.remove(TasksCommand.TASKS_FILE)
-    except OSError:
-        pass
-    try:
-        os.remove(TasksCommand.COMPLETED_TASKS_FILE)
-    except OSError:
-        pass
+    for path in [
+        TasksCommand.TASKS_FILE,
+        TasksCommand.COMPLETED_TASKS_FILE,
+        TasksCommand.JOURNAL_FILE,
+        TasksCommand.TASKS_BINARY_FILE,
+        TasksCommand.COMPLETED_TASKS_BINARY_FILE,
+    ]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
 
 def load_tasks_file():
@@ -74,16 +92,353 @@ class SimpleTest(unittest.TestCase):
         completed = load_completed_file()
         self.assertFalse("Task 15" in completed)
 
+    def test_add_long_cascade(self):
+        for priority in range(1, 5001):
+            self.command_object.current_items[priority] = f"Task {priority}"
+        self.command_object.current_items[5002] = "Task 5002"
+        self.command_object.add(["1", "Task 0"])
+        tasks = load_tasks_file()
+        self.assertEqual(tasks[1], "Task 0")
+        self.assertEqual(tasks[5001], "Task 5000")
+        self.assertEqual(tasks[5002], "Task 5002")
+        self.assertEqual(len(tasks), 5002)
+
+    def test_batch(self):
+        batch_file = "batch.ignore.txt"
+        with open(batch_file, "w") as file:
+            file.write("add 40 Task 41\nadd 40 Task 40\ndone 41\ndelete 42\n")
+        try:
+            self.command_object.batch([batch_file])
+        finally:
+            os.remove(batch_file)
+        self.assertEqual(load_tasks_file(), {40: "Task 40"})
+        self.assertIn("Task 41", load_completed_file())
+
+    def test_batch_reports_bad_lines(self):
+        batch_file = "batch.ignore.txt"
+        with open(batch_file, "w") as file:
+            file.write('add 43 Task 43\nadd 44 "Task 44\nadd 45 Task 45\n')
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                self.command_object.batch([batch_file])
+        finally:
+            os.remove(batch_file)
+        self.assertIn("Error: line 2: No closing quotation", output.getvalue())
+        self.assertEqual(load_tasks_file(), {43: "Task 43", 45: "Task 45"})
+
+    def test_interrupted_write(self):
+        self.command_object.add(["60", "Task 60"])
+
+        def chunks():
+            yield "61 Task 61\n"
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            write_atomically(TasksCommand.TASKS_FILE, chunks())
+        self.assertEqual(load_tasks_file(), {60: "Task 60"})
+        self.assertFalse([path for path in os.listdir() if path.endswith(".tmp")])
+
     def test_pending_render(self):
         task = "".join(random.choices(random_choices, k=20))
         self.command_object.add(["25", task])
         self.assertIn(task, self.command_object.render_pending_tasks())
 
+    def test_ls_page(self):
+        for priority in range(50, 55):
+            self.command_object.add([str(priority), f"Task {priority}"])
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.command_object.ls(["--page", "2", "--limit", "2"])
+        self.assertEqual(output.getvalue(), "3. Task 52 [52]\n4. Task 53 [53]\n")
+
+    def test_ls_rejects_bad_pages(self):
+        for priority in range(50, 55):
+            self.command_object.add([str(priority), f"Task {priority}"])
+        for args in [
+            ["--page", "-1", "--limit", "2"],
+            ["--page", "0", "--limit", "2"],
+            ["--page", "2"],
+            ["--page", "1", "--limit", "0"],
+            ["--page", "x", "--limit", "2"],
+        ]:
+            for command in [self.command_object.ls, self.command_object.report]:
+                with self.subTest(args=args, command=command.__name__):
+                    output = io.StringIO()
+                    with contextlib.redirect_stdout(output):
+                        command(args)
+                    self.assertEqual(
+                        output.getvalue(),
+                        "Error: usage is --limit N [--page N], with numbers from 1.\n",
+                    )
+
+    def test_pending_stream(self):
+        self.command_object.add(["26", "Task 26"])
+        self.command_object.add(["27", "Task 27"])
+        chunks = list(self.command_object.stream_pending_tasks())
+        self.assertEqual(len([chunk for chunk in chunks if "Task 2" in chunk]), 2)
+        self.assertEqual("".join(chunks), self.command_object.render_pending_tasks())
+
     def test_completed_render(self):
         task = "".join(random.choices(random_choices, k=20))
         self.command_object.add(["35", task])
         self.command_object.done(["35"])
         self.assertIn(task, self.command_object.render_completed_tasks())
 
+
+class PriorityIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = PriorityIndex()
+        for priority in [40, 10, 30, 20]:
+            self.index[priority] = f"Task {priority}"
+
+    def test_ordered_iteration(self):
+        self.assertEqual(list(self.index), [10, 20, 30, 40])
+        del self.index[20]
+        self.index[25] = "Task 25"
+        self.assertEqual(list(self.index), [10, 25, 30, 40])
+
+    def test_items_from(self):
+        self.assertEqual(
+            list(self.index.items_from(15, limit=2)),
+            [(20, "Task 20"), (30, "Task 30")],
+        )
+        self.assertEqual(list(self.index.items_from(41)), [])
+
+    def test_items_at(self):
+        self.assertEqual(
+            list(self.index.items_at(1, limit=2)),
+            [(20, "Task 20"), (30, "Task 30")],
+        )
+        self.assertEqual(list(self.index.items_at(3)), [(40, "Task 40")])
+
+
+class JournalStorageTest(unittest.TestCase):
+    def setUp(self):
+        reset_files()
+
+    def tearDown(self):
+        reset_files()
+
+    def journal_command(self):
+        command_object = TasksCommand()
+        command_object.storage = JournalStorage(command_object)
+        command_object.read_current()
+        command_object.read_completed()
+        return command_object
+
+    def test_replay(self):
+        command_object = self.journal_command()
+        command_object.add(["2", "Task 3"])
+        command_object.add(["2", "Task 2"])
+        command_object.add(["7", "Task 7"])
+        command_object.done(["2"])
+        command_object.delete(["7"])
+        replayed = self.journal_command()
+        self.assertEqual(replayed.current_items, {3: "Task 3"})
+        self.assertEqual(replayed.completed_items, ["Task 2"])
+
+    def test_compaction(self):
+        command_object = self.journal_command()
+        command_object.storage.COMPACT_THRESHOLD = 4
+        for priority in range(1, 5):
+            command_object.add([str(priority), f"Task {priority}"])
+        with open(TasksCommand.JOURNAL_FILE) as file:
+            self.assertTrue(all(json.loads(line)[0] == "pending" for line in file))
+        self.assertEqual(len(self.journal_command().current_items), 4)
+
+    def test_torn_record(self):
+        command_object = self.journal_command()
+        command_object.add(["1", "Task 1"])
+        with open(TasksCommand.JOURNAL_FILE, "a") as file:
+            file.write("add 2 Tas")
+        self.assertEqual(self.journal_command().current_items, {1: "Task 1"})
+        command_object = self.journal_command()
+        command_object.add(["2", "Task 2"])
+        self.assertEqual(
+            self.journal_command().current_items, {1: "Task 1", 2: "Task 2"}
+        )
+
+    def test_task_text_cannot_inject_records(self):
+        command_object = self.journal_command()
+        command_object.add(["1", "Task 1"])
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            command_object.add(["2", "Task\ndelete 1"])
+        self.assertIn("Error", output.getvalue())
+        command_object.storage.log("add", 3, 'Task\ndelete 1 "quoted"')
+        command_object.storage.flush()
+        self.assertEqual(
+            self.journal_command().current_items,
+            {1: "Task 1", 3: 'Task\ndelete 1 "quoted"'},
+        )
+
+    def test_replays_unencoded_records(self):
+        with open(TasksCommand.JOURNAL_FILE, "w") as file:
+            file.write("pending 1 Task 1\ncompleted Task 0\nadd 2 Task 2\n")
+        command_object = self.journal_command()
+        self.assertEqual(command_object.current_items, {1: "Task 1", 2: "Task 2"})
+        self.assertEqual(command_object.completed_items, ["Task 0"])
+
+
+class BinaryFileStorageTest(unittest.TestCase):
+    def setUp(self):
+        reset_files()
+
+    def tearDown(self):
+        reset_files()
+
+    def binary_command(self):
+        command_object = TasksCommand()
+        command_object.storage = BinaryFileStorage(command_object)
+        command_object.read_current()
+        command_object.read_completed()
+        return command_object
+
+    def test_convert(self):
+        command_object = TasksCommand()
+        for priority in [3, 1, 2]:
+            command_object.add([str(priority), f"Task {priority}"])
+        command_object.done(["3"])
+        TasksCommand().run("convert", ["text", "binary"])
+        os.remove(TasksCommand.TASKS_FILE)
+        os.remove(TasksCommand.COMPLETED_TASKS_FILE)
+        TasksCommand().run("convert", ["binary", "text"])
+        self.assertEqual(load_tasks_file(), {1: "Task 1", 2: "Task 2"})
+        self.assertEqual(load_completed_file(), ["Task 3"])
+
+    def test_lazy_load(self):
+        command_object = self.binary_command()
+        for priority in range(1, 6):
+            command_object.add([str(priority), f"Task {priority}"], flush=False)
+        command_object.storage.flush()
+        command_object = self.binary_command()
+        self.assertEqual(command_object.current_items.tasks, {})
+        self.assertEqual(command_object.current_items[4], "Task 4")
+        command_object.add(["2", "Task 0"])
+        command_object.delete(["5"])
+        self.assertEqual(
+            dict(self.binary_command().current_items),
+            {1: "Task 1", 2: "Task 0", 3: "Task 2", 4: "Task 3", 6: "Task 5"},
+        )
+
+    def test_lazy_completed(self):
+        command_object = self.binary_command()
+        for priority in range(1, 5):
+            command_object.add([str(priority), f"Task {priority}"], flush=False)
+            command_object.done([str(priority)], flush=False)
+        command_object.storage.flush()
+        command_object = self.binary_command()
+        completed = command_object.completed_items
+        self.assertEqual(completed.appended, [])
+        self.assertEqual(len(completed), 4)
+        self.assertEqual(completed[1:3], ["Task 2", "Task 3"])
+        command_object.add(["5", "Task 5"])
+        command_object.done(["5"])
+        self.assertEqual(completed[-1], "Task 5")
+        self.assertEqual(
+            list(self.binary_command().completed_items),
+            ["Task 1", "Task 2", "Task 3", "Task 4", "Task 5"],
+        )
+
+
+class TaskStoreTest(unittest.TestCase):
+    def setUp(self):
+        reset_files()
+        self.store = TaskStore()
+
+    def tearDown(self):
+        reset_files()
+
+    def test_reuses_loaded_tasks(self):
+        self.store.run("add", ["1", "Task 1"])
+        command_object = self.store.load()
+        self.assertIs(self.store.load(), command_object)
+        self.assertEqual(command_object.current_items, {1: "Task 1"})
+        self.assertEqual(load_tasks_file(), {1: "Task 1"})
+
+    def test_reloads_external_changes(self):
+        command_object = self.store.load()
+        TasksCommand().run("add", ["1", "Task 1"])
+        self.assertIsNot(self.store.load(), command_object)
+        self.assertEqual(self.store.load().current_items, {1: "Task 1"})
+
+
+class QuietTasksServer(TasksServer):
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledHTTPServerTest(unittest.TestCase):
+    def setUp(self):
+        reset_files()
+        self.server = PooledHTTPServer(("127.0.0.1", 0), QuietTasksServer, 1)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        reset_files()
+
+    def connect(self):
+        return http.client.HTTPConnection(*self.server.server_address, timeout=2)
+
+    def get(self, connection, path):
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, response.read().decode()
+
+    def test_keep_alive(self):
+        connection = self.connect()
+        self.assertEqual(self.get(connection, "/add?priority=1&task=Task+1")[0], 200)
+        sock = connection.sock
+        status, body = self.get(connection, "/tasks")
+        self.assertEqual(status, 200)
+        self.assertIn("Task 1", body)
+        self.assertIs(connection.sock, sock)
+        connection.close()
+
+    def test_idle_connections_do_not_hold_workers(self):
+        idle = [self.connect() for _ in range(3)]
+        for connection in idle:
+            self.assertEqual(self.get(connection, "/tasks")[0], 200)
+        # The only worker is free while the connections above wait.
+        connection = self.connect()
+        self.assertEqual(self.get(connection, "/tasks")[0], 200)
+        for connection in [*idle, connection]:
+            self.assertEqual(self.get(connection, "/tasks")[0], 200)
+            connection.close()
+
+    def test_page_params(self):
+        connection = self.connect()
+        for priority in range(1, 4):
+            self.get(connection, f"/add?priority={priority}&task=Task+{priority}")
+        status, body = self.get(connection, "/tasks?limit=0")
+        self.assertEqual(status, 200)
+        self.assertIn("/tasks?after=1&limit=1", body)
+        self.assertEqual(self.get(connection, "/completed?limit=-1&offset=-5")[0], 200)
+        for path in ["/tasks?limit=x", "/tasks?after=x", "/completed?offset=x"]:
+            self.assertEqual(self.get(connection, path), (400, ""))
+        self.assertEqual(self.get(connection, "/add?priority=x&task=Task")[0], 400)
+        self.assertEqual(self.get(connection, "/tasks")[0], 200)
+        connection.close()
+
+    def test_runserver_options(self):
+        with mock.patch("solve_me.PooledHTTPServer") as server_class:
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                TasksCommand().runserver(
+                    ["--bind", "0.0.0.0", "--port", "8080", "--workers", "8"]
+                )
+        server_class.assert_called_once_with(("0.0.0.0", 8080), TasksServer, 8)
+        server_class.return_value.serve_forever.assert_called_once_with()
+        self.assertIn("http://0.0.0.0:8080 with 8 workers", output.getvalue())
+
+    def test_runserver_defaults(self):
+        with mock.patch("solve_me.PooledHTTPServer") as server_class:
+            with contextlib.redirect_stdout(io.StringIO()):
+                TasksCommand().runserver([])
+        server_class.assert_called_once_with(("127.0.0.1", 8000), TasksServer, 4)
+
+
 reset_files()
 unittest.main()
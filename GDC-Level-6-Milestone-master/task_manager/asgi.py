@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up. Serves the task event streams without tying up the event loop, which
+# Django 4.0 would, as it iterates streaming responses on the loop.
+from tasks.asgi import EventStreamApplication  # noqa: E402
+
+application = EventStreamApplication(django_application)
@@ -88,6 +88,28 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Task list pages, API list responses and task counts are cached per user, see `tasks.caching`.
+# Any shared backend (e.g. Memcached or Redis) can be swapped in for multi-process deployments.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "task-manager",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+
+# Task status change log retention
+# Logs older than this many days are moved to the archive by the `archive_status_changes` command,
+# and are only listed by the API with `?include_archived=1`.
+
+TASK_STATUS_LOG_RETENTION_DAYS = 90
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -19,17 +19,32 @@ from django.db import router
 from django.urls import path, include
 from rest_framework_nested import routers
 
-from tasks.apiviews import TaskStatusChangesViewSet, TaskViewSet
+from tasks.apiviews import (
+    TaskEventsView,
+    TaskStatusAnalyticsViewSet,
+    TaskStatusChangesViewSet,
+    TaskViewSet,
+    UserTaskStatsViewSet,
+)
+from tasks.asyncviews import task_detail, task_list, task_status_changes
 
 router = routers.DefaultRouter()
 
 router.register("tasks", TaskViewSet)
 router.register("task-status-changes", TaskStatusChangesViewSet)
+router.register("stats", UserTaskStatsViewSet, basename="stats")
+router.register("task-status-analytics", TaskStatusAnalyticsViewSet, basename="task-status-analytics")
 
 from tasks.views import *
 
 urlpatterns = [
     path("api/v1/", include(router.urls)),
+    # Async versions of the read endpoints of the API, for the ASGI deployment.
+    path("api/v1/async/tasks/", task_list),
+    path("api/v1/async/tasks/<int:pk>/", task_detail),
+    path("api/v1/async/task-status-changes/", task_status_changes),
+    # Server-sent events of the changes to the user's tasks, for clients to follow instead of polling.
+    path("api/v1/events/", TaskEventsView.as_view()),
     path("admin/", admin.site.urls),
     # For hot-reloading.
     path("__reload__/", include("django_browser_reload.urls")),
@@ -44,4 +59,6 @@ urlpatterns = [
     path("create-task/", TaskCreateView.as_view()),
     path("update-task/<pk>/", TaskUpdateView.as_view()),
     path("delete-task/<pk>/", GenericTaskDeleteView.as_view()),
+    # Cache hit and miss counters, for scraping.
+    path("metrics/", CacheMetricsView.as_view()),
 ]
@@ -1,4 +1,10 @@
+import queue
+
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import (
     DjangoFilterBackend,
     FilterSet,
@@ -8,11 +14,28 @@ from django_filters.rest_framework import (
     ChoiceFilter,
     ModelChoiceFilter,
 )
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.fields import BooleanField, IntegerField, ListField
+from rest_framework.pagination import Cursor, CursorPagination
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.serializers import ModelSerializer
-from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.serializers import ModelSerializer, Serializer
+from rest_framework.views import APIView
+from rest_framework.viewsets import GenericViewSet, ModelViewSet, ReadOnlyModelViewSet
 
-from tasks.models import Task, TaskStatusChangeLog
+from tasks import caching, events
+from tasks.events import Event, get_status_change_data
+from tasks.models import (
+    Task,
+    TaskStatusChangeLog,
+    TaskStatusChangeLogHistory,
+    TaskStatusRollup,
+    UserTaskStats,
+)
+from tasks.search import get_search_backend
 
 
 class UserSerializer(ModelSerializer):
@@ -23,7 +46,17 @@ class UserSerializer(ModelSerializer):
         fields = ("first_name", "last_name", "username")
 
 
-class TaskSerializer(ModelSerializer):
+class SparseFieldsetMixin:
+    """Drops every serializer field not named in the `fields` keyword argument, when one is given."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TaskSerializer(SparseFieldsetMixin, ModelSerializer):
     """Serializer for Task model."""
 
     user = UserSerializer(read_only=True)
@@ -33,14 +66,99 @@ class TaskSerializer(ModelSerializer):
         fields = ["id", "title", "description", "priority", "completed", "user", "status"]
 
 
+class TaskIdSerializer(Serializer):
+    """Serializer for the `id` identifying each task of a bulk update."""
+
+    id = IntegerField()
+
+
 class TaskFilter(FilterSet):
     """Filter sets for Tasks."""
 
     title = CharFilter(lookup_expr="icontains")
     completed = BooleanFilter()
+    search = CharFilter(method="filter_search", label="Search")
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
+
+class TaskCursorPagination(CursorPagination):
+    """
+    Cursor pagination that seeks on the whole `ordering` key. DRF's `CursorPagination` only seeks on the first
+    ordering field and pages through ties by offset, which for `completed` means offsetting through every task.
+    """
+
+    ordering = ("completed", "priority", "id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        """Orders search results by relevance, and everything else like the listings."""
+        if "search_rank" in queryset.query.annotations:
+            return ("search_rank", "id")
+        return super().get_ordering(request, queryset, view)
+
+    def get_position(self, task) -> str:
+        values = [getattr(task, field) for field in self.ordering]
+        return ",".join(repr(value) if isinstance(value, float) else str(int(value)) for value in values)
+
+    def parse_position(self, position) -> list:
+        try:
+            values = [int(value) if value.lstrip("-").isdigit() else float(value) for value in position.split(",")]
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if self.cursor is not None:
+            queryset = queryset.seek(
+                self.ordering, self.parse_position(self.cursor.position), "lt" if reverse else "gt"
+            )
+        ordering = [f"-{field}" for field in self.ordering] if reverse else self.ordering
+        tasks = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        has_more = len(tasks) > self.page_size
+        self.page = tasks[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = self.cursor is not None, has_more
+        self.display_page_controls = bool(self.page) and (self.has_previous or self.has_next)
+        return self.page
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.get_position(self.page[0])))
+
 
+class CachedListMixin:
+    """Serves list responses from the per-user cache, which writes to the user's tasks invalidate."""
 
-class TaskViewSet(ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        uncached_list = super().list
+        data = caching.get_or_set(
+            request.user.id, "api", request.build_absolute_uri(), lambda: uncached_list(request, *args, **kwargs).data
+        )
+        return Response(data)
+
+
+class TaskViewSet(CachedListMixin, ModelViewSet):
     """Model View Set for Tasks"""
 
     queryset = Task.objects.all()
@@ -48,13 +166,103 @@ class TaskViewSet(ModelViewSet):
     permission_classes = (IsAuthenticated,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TaskFilter
+    pagination_class = TaskCursorPagination
+    read_actions = ("list", "retrieve")
+
+    def get_fields(self):
+        """The serializer fields requested by a read with `?fields=id,title`, or None for all of them."""
+        fields = self.request.query_params.get("fields")
+        if not fields or self.action not in self.read_actions:
+            return None
+        fields = fields.split(",")
+        unknown = set(fields) - set(TaskSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}."})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.get_fields())
+        return super().get_serializer(*args, **kwargs)
 
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user, deleted=False)
+        queryset = Task.objects.filter(user=self.request.user, deleted=False)
+        if self.action not in self.read_actions:
+            return queryset
+        # Only load the serialized columns, plus the ones pagination positions are built from.
+        fields = self.get_fields() or TaskSerializer.Meta.fields
+        columns = {field for field in fields if field != "user"} | set(self.pagination_class.ordering)
+        if "user" in fields:
+            queryset = queryset.select_related("user")
+            columns |= {f"user__{field}" for field in UserSerializer.Meta.fields}
+        return queryset.only(*columns)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def lock_queryset(self):
+        """Locks the user's row, serializing concurrent priority cascades over their tasks, and returns the tasks."""
+        User.objects.select_for_update().filter(id=self.request.user.id).first()
+        return self.get_queryset()
+
+    def get_bulk_tasks(self, queryset, ids) -> list:
+        """Returns the tasks with the given ids in order, or raises a `ValidationError` naming the unknown ones."""
+        tasks = queryset.in_bulk(ids)
+        errors = [{} if task_id in tasks else {"id": ["No such task."]} for task_id in ids]
+        if any(errors):
+            raise ValidationError(errors)
+        return [tasks[task_id] for task_id in ids]
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Creates a list of tasks in one transaction, resolving their priority collisions together."""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        tasks = [Task(user=request.user, **data) for data in serializer.validated_data]
+        with transaction.atomic():
+            Task.objects.bulk_update(self.lock_queryset().resolve_priorities(tasks), ["priority"])
+            Task.objects.bulk_create(tasks)
+            # `bulk_create` sends no `post_save` signals.
+            get_search_backend().index(tasks)
+            UserTaskStats.record_changes(
+                {}, UserTaskStats.count_tasks(Task.objects.filter(id__in=[task.id for task in tasks]))
+            )
+        caching.invalidate(request.user.id)
+        events.publish(request.user.id, "refresh", {})
+        return Response(self.get_serializer(tasks, many=True).data, status=status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        """Partially updates a list of tasks, each identified by its `id`, in one transaction."""
+        ids = [item["id"] for item in ListField(child=TaskIdSerializer()).run_validation(request.data)]
+        with transaction.atomic():
+            queryset = self.lock_queryset()
+            tasks = self.get_bulk_tasks(queryset, ids)
+            for task in tasks:
+                task.user = request.user  # The tasks are all the user's, so serializing them costs no queries.
+            serializers = [
+                self.get_serializer(task, data=data, partial=True) for task, data in zip(tasks, request.data)
+            ]
+            if not all([serializer.is_valid() for serializer in serializers]):
+                raise ValidationError([serializer.errors for serializer in serializers])
+            fields = {"priority"}
+            for task, serializer in zip(tasks, serializers):
+                for field, value in serializer.validated_data.items():
+                    setattr(task, field, value)
+                    fields.add(field)
+            Task.objects.bulk_update(queryset.resolve_priorities(tasks), ["priority"])
+            Task.objects.bulk_update(tasks, fields)  # Logs the status changes with batched INSERTs.
+        return Response(self.get_serializer(tasks, many=True).data)
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        """Deletes a list of tasks, given by their ids, in one transaction."""
+        ids = ListField(child=IntegerField()).run_validation(request.data)
+        with transaction.atomic():
+            queryset = self.get_queryset()
+            self.get_bulk_tasks(queryset, ids)
+            queryset.filter(id__in=ids).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class TaskStatusChangeLogSerializer(ModelSerializer):
     class TaskSerializer(ModelSerializer):
@@ -79,14 +287,195 @@ class TaskStatusChangesFilter(FilterSet):
     new_status = ChoiceFilter(choices=Task.Statuses.choices)
 
 
-class TaskStatusChangesViewSet(ReadOnlyModelViewSet):
-    """Model View Set for Task Status Changes Log model."""
+class TaskStatusChangesPagination(CursorPagination):
+    """Newest first cursor pagination for the status change log, which only ever grows."""
+
+    ordering = ("-timestamp", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class TaskStatusChangesViewSet(CachedListMixin, ReadOnlyModelViewSet):
+    """
+    Model View Set for Task Status Changes Log model. Archived logs are left out unless `?include_archived=1`
+    is given, which reads from the view over both the hot and the archived logs instead.
+    """
 
     queryset = TaskStatusChangeLog.objects.all()
     serializer_class = TaskStatusChangeLogSerializer
     permission_classes = (IsAuthenticated,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TaskStatusChangesFilter
+    pagination_class = TaskStatusChangesPagination
 
     def get_queryset(self):
-        return TaskStatusChangeLog.objects.filter(task__user=self.request.user)
+        task_fields = TaskStatusChangeLogSerializer.TaskSerializer.Meta.fields
+        include_archived = self.request.query_params.get("include_archived") in BooleanField.TRUE_VALUES
+        model = TaskStatusChangeLogHistory if include_archived else TaskStatusChangeLog
+        return (
+            model.objects.filter(task__user=self.request.user)
+            .select_related("task")
+            .only("task", "timestamp", "old_status", "new_status", *(f"task__{field}" for field in task_fields))
+        )
+
+
+class UserTaskStatsSerializer(ModelSerializer):
+    """Serializer for UserTaskStats model."""
+
+    pending = IntegerField(read_only=True)
+
+    class Meta:
+        model = UserTaskStats
+        fields = ["total", "pending", "completed", "deleted", *UserTaskStats.status_fields.values()]
+
+
+class UserTaskStatsViewSet(GenericViewSet):
+    """View Set for the task stats of the authenticated user."""
+
+    serializer_class = UserTaskStatsSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def list(self, request):
+        return Response(self.get_serializer(UserTaskStats.get_for_user(request.user.id)).data)
+
+
+class TaskStatusRollupSerializer(ModelSerializer):
+    """Serializer for TaskStatusRollup model."""
+
+    class Meta:
+        model = TaskStatusRollup
+        fields = ["bucket", "old_status", "new_status", "transitions"]
+
+
+class TaskStatusAnalyticsFilter(FilterSet):
+    """Filter sets for Task Status Rollups."""
+
+    bucket = DateTimeFromToRangeFilter(field_name="bucket", label="Date")
+    old_status = ChoiceFilter(choices=Task.Statuses.choices)
+    new_status = ChoiceFilter(choices=Task.Statuses.choices)
+
+
+class TaskStatusAnalyticsViewSet(GenericViewSet):
+    """
+    View Set for the status changes of the authenticated user's tasks counted per `period` (an `hour`, `day` or
+    `week`) and the mean seconds spent in each status before changing, read from the status rollups.
+    """
+
+    serializer_class = TaskStatusRollupSerializer
+    permission_classes = (IsAuthenticated,)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = TaskStatusAnalyticsFilter
+
+    def get_period(self) -> str:
+        period = self.request.query_params.get("period", TaskStatusRollup.Periods.DAY)
+        if period not in TaskStatusRollup.Periods.values:
+            raise ValidationError({"period": f"Must be one of {', '.join(TaskStatusRollup.Periods.values)}."})
+        return period
+
+    def get_queryset(self):
+        return TaskStatusRollup.objects.filter(user=self.request.user, period=self.get_period())
+
+    def list(self, request):
+        rollups = self.filter_queryset(self.get_queryset())
+        time_in_status = (
+            rollups.order_by("old_status")
+            .values("old_status")
+            .annotate(total=Sum("time_in_status"), timed=Sum("timed_transitions"))
+        )
+        return Response(
+            {
+                "period": self.get_period(),
+                "transitions": self.get_serializer(
+                    rollups.order_by("bucket", "old_status", "new_status"), many=True
+                ).data,
+                "mean_time_in_status": {
+                    row["old_status"]: row["total"] / row["timed"] for row in time_in_status if row["timed"]
+                },
+            }
+        )
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renderer for clients accepting `text/event-stream`, which only gets to render errors, as an `error` event."""
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return Event("error", data).encode()
+
+
+class TaskEventsView(APIView):
+    """
+    Streams the changes to the authenticated user's tasks as server-sent events, see `tasks.events`. A client
+    reconnecting with `Last-Event-ID` has the status changes it missed replayed from the status change log,
+    followed by a `refresh` for the changes that aren't logged.
+
+    The stream blocks the thread serving it, which suits a threaded WSGI server but would block the event loop
+    under ASGI, so ASGI deployments serve it with `tasks.asgi.EventStreamApplication` instead.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (JSONRenderer, EventStreamRenderer)
+    heartbeat = 15
+    """Seconds between the comments that keep idle connections open, and reveal the ones that were closed."""
+    retry = 3000
+    """Milliseconds clients wait before reconnecting."""
+    max_replay = 1000
+    """The most missed status changes replayed, a client further behind is only told to refresh."""
+
+    stream_headers = {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Keeps nginx from buffering the stream.
+    }
+    """The headers of the event stream, shared with `tasks.asgi`."""
+
+    def get(self, request):
+        if isinstance(request._request, ASGIRequest):
+            return Response({"detail": "Served by tasks.asgi under ASGI."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        last_event_id = self.get_last_event_id(request)
+        response = StreamingHttpResponse(self.stream(request.user.id, last_event_id))
+        for header, value in self.stream_headers.items():
+            response[header] = value
+        return response
+
+    @staticmethod
+    def get_last_event_id(request):
+        try:
+            return int(request.headers["Last-Event-ID"])
+        except (KeyError, ValueError):
+            return None
+
+    def replay(self, user_id, last_event_id) -> list:
+        logs = list(
+            TaskStatusChangeLog.objects.filter(task__user_id=user_id, id__gt=last_event_id).order_by("id")[
+                : self.max_replay + 1
+            ]
+        )
+        if len(logs) > self.max_replay:
+            return []
+        return [Event("status", get_status_change_data(log), id=log.id) for log in logs]
+
+    def stream(self, user_id, last_event_id):
+        # Subscribing before replaying leaves no gap between the two, the overlap is skipped by event id.
+        subscription = events.bus.subscribe(user_id)
+        try:
+            yield f"retry: {self.retry}\n\n".encode()
+            if last_event_id is not None:
+                for event in self.replay(user_id, last_event_id):
+                    last_event_id = event.id
+                    yield event.encode()
+                yield Event("refresh", {}).encode()
+            while True:
+                try:
+                    event = subscription.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield b": heartbeat\n\n"
+                    continue
+                if event.id is not None and last_event_id is not None and event.id <= last_event_id:
+                    continue
+                yield event.encode()
+        finally:
+            events.bus.unsubscribe(user_id, subscription)
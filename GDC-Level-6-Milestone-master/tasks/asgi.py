@@ -0,0 +1,102 @@
+import asyncio
+import io
+import json
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import DisallowedHost
+from django.core.handlers.asgi import ASGIRequest
+
+from tasks import events
+from tasks.apiviews import TaskEventsView
+from tasks.asyncviews import aget_user
+from tasks.events import Event
+
+
+class EventStreamApplication:
+    """
+    ASGI application serving the server-sent events of `TaskEventsView` at `path` without blocking the event loop,
+    and passing every other request on to `application`. Events are awaited from an `AsyncSubscription`, and the
+    missed status changes are replayed off the loop. Like the async views, requests are authenticated by session.
+    """
+
+    def __init__(self, application, path="/api/v1/events/"):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == self.path and scope["method"] in ("GET", "HEAD"):
+            await self.serve(scope, receive, send)
+        else:
+            await self.application(scope, receive, send)
+
+    async def serve(self, scope, receive, send):
+        request = ASGIRequest(scope, io.BytesIO())
+        try:
+            request.get_host()
+        except DisallowedHost:
+            await self.send_json(send, 400, {"detail": "Invalid host."})
+            return
+        session_engine = import_module(settings.SESSION_ENGINE)
+        request.session = session_engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            await self.send_json(send, 403, {"detail": "Authentication credentials were not provided."})
+            return
+        headers = [(name.lower().encode(), value.encode()) for name, value in TaskEventsView.stream_headers.items()]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body"})
+            return
+        await self.stream(receive, send, user.id, TaskEventsView.get_last_event_id(request))
+
+    async def stream(self, receive, send, user_id, last_event_id):
+        view = TaskEventsView()
+        # Subscribing before replaying leaves no gap between the two, the overlap is skipped by event id.
+        subscription = events.bus.subscribe(user_id, events.AsyncSubscription())
+        disconnect = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        get = None
+        try:
+            await self.send_body(send, f"retry: {view.retry}\n\n".encode())
+            if last_event_id is not None:
+                for event in await sync_to_async(view.replay)(user_id, last_event_id):
+                    last_event_id = event.id
+                    await self.send_body(send, event.encode())
+                await self.send_body(send, Event("refresh", {}).encode())
+            while True:
+                # The pending `get` is kept across heartbeats, so that no event is lost to cancelling it.
+                get = get or asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {get, disconnect}, timeout=view.heartbeat, return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnect in done:
+                    return
+                if get not in done:
+                    await self.send_body(send, b": heartbeat\n\n")
+                    continue
+                event, get = get.result(), None
+                if event.id is not None and last_event_id is not None and event.id <= last_event_id:
+                    continue
+                await self.send_body(send, event.encode())
+        finally:
+            events.bus.unsubscribe(user_id, subscription)
+            disconnect.cancel()
+            if get is not None:
+                get.cancel()
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @staticmethod
+    async def send_body(send, body: bytes):
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+
+    @staticmethod
+    async def send_json(send, status: int, data: dict):
+        body = json.dumps(data).encode()
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,140 @@
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.http import urlencode
+from rest_framework.fields import BooleanField
+
+from tasks import caching
+from tasks.apiviews import (
+    TaskCursorPagination,
+    TaskSerializer,
+    TaskStatusChangeLogSerializer,
+    TaskStatusChangesPagination,
+    UserSerializer,
+)
+from tasks.models import Task, TaskStatusChangeLog, TaskStatusChangeLogHistory
+
+# Django 4.0 has no async ORM yet (`aget`, `acount` and `aiterator` arrive in 4.1), so queries are awaited
+# through `sync_to_async`, which runs them in the one thread the ORM is confined to under ASGI.
+alist = sync_to_async(list)
+aget = sync_to_async(lambda queryset, **kwargs: queryset.get(**kwargs))
+aget_user = sync_to_async(get_user)
+
+INVALID_CURSOR = {"detail": "Invalid cursor"}
+
+
+def async_login_required(view):
+    """Resolves `request.user` off the event loop, and turns away anonymous requests like the API does."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await aget_user(request)
+        if not request.user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=403)
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def get_page_size(request, pagination) -> int:
+    try:
+        page_size = int(request.GET.get("page_size", pagination.page_size))
+    except ValueError:
+        page_size = pagination.page_size
+    return max(1, min(page_size, pagination.max_page_size))
+
+
+def get_page_url(request, **params):
+    return request.build_absolute_uri(f"?{urlencode(params)}")
+
+
+def get_task_queryset(user):
+    """The tasks of `user`, loading the columns `TaskSerializer` and the pagination need, like `TaskViewSet`."""
+    columns = {field for field in TaskSerializer.Meta.fields if field != "user"} | set(TaskCursorPagination.ordering)
+    columns |= {f"user__{field}" for field in UserSerializer.Meta.fields}
+    return Task.objects.filter(user=user, deleted=False).select_related("user").only(*columns)
+
+
+@async_login_required
+async def task_list(request):
+    """
+    Async version of `GET /api/v1/tasks/`, without its filters. Pages by `?after=` the comma separated
+    `completed,priority,id` of the last task of the previous page.
+    """
+    ordering = TaskCursorPagination.ordering
+    page_size = get_page_size(request, TaskCursorPagination)
+    tasks = get_task_queryset(request.user)
+    after = request.GET.get("after")
+    if after:
+        try:
+            position = [int(value) for value in after.split(",")]
+        except ValueError:
+            return JsonResponse(INVALID_CURSOR, status=404)
+        if len(position) != len(ordering):
+            return JsonResponse(INVALID_CURSOR, status=404)
+        tasks = tasks.seek(ordering, position, "gt")
+
+    async def get_page():
+        page = await alist(tasks.order_by(*ordering)[: page_size + 1])
+        next_url = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            position = ",".join(str(int(getattr(page[-1], field))) for field in ordering)
+            next_url = get_page_url(request, after=position, page_size=page_size)
+        return {"next": next_url, "results": TaskSerializer(page, many=True).data}
+
+    data = await caching.aget_or_set(request.user.id, "async-api", request.build_absolute_uri(), get_page)
+    return JsonResponse(data)
+
+
+@async_login_required
+async def task_detail(request, pk):
+    """Async version of `GET /api/v1/tasks/<pk>/`."""
+    try:
+        task = await aget(get_task_queryset(request.user), id=pk)
+    except Task.DoesNotExist:
+        return JsonResponse({"detail": "Not found."}, status=404)
+    return JsonResponse(TaskSerializer(task).data)
+
+
+@async_login_required
+async def task_status_changes(request):
+    """
+    Async version of `GET /api/v1/task-status-changes/`, without its filters. Takes `?include_archived=1` like it,
+    and pages by `?after=` the comma separated ISO timestamp and id of the last log of the previous page.
+    """
+    page_size = get_page_size(request, TaskStatusChangesPagination)
+    include_archived = request.GET.get("include_archived") in BooleanField.TRUE_VALUES
+    model = TaskStatusChangeLogHistory if include_archived else TaskStatusChangeLog
+    task_fields = TaskStatusChangeLogSerializer.TaskSerializer.Meta.fields
+    logs = (
+        model.objects.filter(task__user=request.user)
+        .select_related("task")
+        .only("task", "timestamp", "old_status", "new_status", *(f"task__{field}" for field in task_fields))
+    )
+    after = request.GET.get("after")
+    if after:
+        try:
+            timestamp, log_id = after.rsplit(",", 1)
+            timestamp, log_id = datetime.fromisoformat(timestamp), int(log_id)
+        except ValueError:
+            return JsonResponse(INVALID_CURSOR, status=404)
+        logs = logs.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=log_id))
+
+    async def get_page():
+        page = await alist(logs.order_by(*TaskStatusChangesPagination.ordering)[: page_size + 1])
+        next_url = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            params = {"after": f"{page[-1].timestamp.isoformat()},{page[-1].id}", "page_size": page_size}
+            if include_archived:
+                params["include_archived"] = 1
+            next_url = get_page_url(request, **params)
+        return {"next": next_url, "results": TaskStatusChangeLogSerializer(page, many=True).data}
+
+    data = await caching.aget_or_set(request.user.id, "async-api", request.build_absolute_uri(), get_page)
+    return JsonResponse(data)
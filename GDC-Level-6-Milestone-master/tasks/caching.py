@@ -0,0 +1,79 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+stats = Counter()
+"""The number of `(kind, "hit" | "miss")` lookups served by this process, for scraping."""
+
+stats_lock = threading.Lock()
+
+MISSING = object()
+
+
+def get_version_key(user_id) -> str:
+    return f"task-cache-version:{user_id}"
+
+
+def get_versioned_key(user_id, version, kind: str, key: str) -> str:
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return f"task-cache:{user_id}:{version}:{kind}:{digest}"
+
+
+def count_lookup(kind: str, value) -> None:
+    with stats_lock:
+        stats[(kind, "miss" if value is MISSING else "hit")] += 1
+
+
+def get_or_set(user_id, kind: str, key: str, default):
+    """
+    Returns the value of the given `kind` cached for `key` (e.g. a URL) under the user's current cache version,
+    computing and caching it with `default()` on a miss.
+    """
+    # Versions start from the clock rather than from 1, so that a version evicted from the cache
+    # can't come back and revive the entries cached under it.
+    version = cache.get_or_set(get_version_key(user_id), time.time_ns, timeout=None)
+    versioned_key = get_versioned_key(user_id, version, kind, key)
+    value = cache.get(versioned_key, MISSING)
+    count_lookup(kind, value)
+    if value is MISSING:
+        value = default()
+        cache.set(versioned_key, value)
+    return value
+
+
+async def aget_or_set(user_id, kind: str, key: str, default):
+    """Async version of `get_or_set` for async views, awaiting `default()` on a miss."""
+    version = await cache.aget_or_set(get_version_key(user_id), time.time_ns, timeout=None)
+    versioned_key = get_versioned_key(user_id, version, kind, key)
+    value = await cache.aget(versioned_key, MISSING)
+    count_lookup(kind, value)
+    if value is MISSING:
+        value = await default()
+        await cache.aset(versioned_key, value)
+    return value
+
+
+def invalidate(*user_ids) -> None:
+    """
+    Drops everything cached for the users by moving them on to a new cache version, once the current transaction
+    commits. Moving on any earlier would let a request still reading the old rows cache them under the new version.
+    """
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: increment_versions(user_ids))
+
+
+def increment_versions(user_ids) -> None:
+    for user_id in user_ids:
+        try:
+            cache.incr(get_version_key(user_id))
+        except ValueError:  # No version yet, so nothing has been cached.
+            pass
+
+
+def get_stats() -> dict:
+    with stats_lock:
+        return dict(stats)
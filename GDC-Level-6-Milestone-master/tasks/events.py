@@ -0,0 +1,136 @@
+import asyncio
+import json
+import queue
+import threading
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+class Event:
+    """
+    A server-sent event of a user's tasks: `task` (created or updated), `delete`, `status` (a status change, whose
+    id is that of its `TaskStatusChangeLog`) or `refresh` (tasks changed in bulk, to be fetched again).
+    """
+
+    def __init__(self, name: str, data: dict, id=None):
+        self.name = name
+        self.data = data
+        self.id = id
+
+    def encode(self) -> bytes:
+        lines = [f"event: {self.name}"]
+        if self.id is not None:
+            lines.append(f"id: {self.id}")
+        lines.append(f"data: {json.dumps(self.data, cls=DjangoJSONEncoder)}")
+        return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscription:
+    """The queue of events published to a user since subscribing. Events past `max_size` are dropped."""
+
+    max_size = 1000
+
+    def __init__(self):
+        self.queue = queue.Queue(self.max_size)
+        self.overflowed = False
+
+    def put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout: float) -> Event:
+        """Returns the next event, or a `refresh` after events were dropped. Raises `queue.Empty` on timeout."""
+        if self.overflowed:
+            self.overflowed = False
+            return Event("refresh", {})
+        return self.queue.get(timeout=timeout)
+
+
+class AsyncSubscription(Subscription):
+    """A `Subscription` whose events are awaited on the event loop it was created on."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.max_size)
+        self.overflowed = False
+
+    def put(self, event: Event) -> None:
+        # Events are published from the threads writing the tasks, and handed over to the loop.
+        try:
+            self.loop.call_soon_threadsafe(self.put_nowait, event)
+        except RuntimeError:  # The loop is closed, so nothing awaits the events anymore.
+            pass
+
+    def put_nowait(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self) -> Event:
+        """Returns the next event, or a `refresh` after events were dropped. Time it out with `asyncio.wait`."""
+        if self.overflowed:
+            self.overflowed = False
+            return Event("refresh", {})
+        return await self.queue.get()
+
+
+class EventBus:
+    """
+    In-process publish/subscribe of task events by user. Subscribers only see the events published by their own
+    process, so multi-process deployments need a shared broker (e.g. Redis pub/sub) behind the same interface.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)  # user id -> subscriptions
+
+    def subscribe(self, user_id, subscription=None) -> Subscription:
+        """Subscribes `subscription` (a new `Subscription` by default) to the events of the user, and returns it."""
+        if subscription is None:
+            subscription = Subscription()
+        with self.lock:
+            self.subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription: Subscription) -> None:
+        with self.lock:
+            self.subscriptions[user_id].discard(subscription)
+            if not self.subscriptions[user_id]:
+                del self.subscriptions[user_id]
+
+    def publish(self, user_id, event: Event) -> None:
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+
+bus = EventBus()
+
+
+def publish(user_id, name: str, data: dict, id=None) -> None:
+    """Publishes an event to the user's subscribers once the current transaction commits, if it does."""
+    if user_id is None:
+        return
+    event = Event(name, data, id)
+    transaction.on_commit(lambda: bus.publish(user_id, event))
+
+
+def get_status_change_data(log) -> dict:
+    return {
+        "task": log.task_id,
+        "timestamp": log.timestamp,
+        "old_status": log.old_status,
+        "new_status": log.new_status,
+    }
+
+
+def publish_status_changes(logs, users: dict) -> None:
+    """Publishes a `status` event per status change log, `users` mapping the ids of their tasks to their users."""
+    for log in logs:
+        publish(users[log.task_id], "status", get_status_change_data(log), id=log.id)
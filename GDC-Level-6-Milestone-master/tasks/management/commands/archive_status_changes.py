@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from tasks import caching
+from tasks.models import ArchivedTaskStatusChangeLog, Task, TaskStatusChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the status change logs older than the retention period into the archive, a chunk per transaction, "
+        "and purges the archived logs of deleted tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=getattr(settings, "TASK_STATUS_LOG_RETENTION_DAYS", 90),
+            help="Age in days past which logs are archived. Defaults to the TASK_STATUS_LOG_RETENTION_DAYS setting.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Number of logs moved per transaction.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        archived = 0
+        while True:
+            # Short transactions keep the hot table from being locked for the whole run.
+            with transaction.atomic():
+                logs = list(
+                    TaskStatusChangeLog.objects.filter(timestamp__lt=cutoff)
+                    .order_by("id")
+                    .values("id", "task", "timestamp", "old_status", "new_status", user=F("task__user"))[
+                        : options["chunk_size"]
+                    ]
+                )
+                if not logs:
+                    break
+                ArchivedTaskStatusChangeLog.objects.bulk_create(
+                    ArchivedTaskStatusChangeLog(
+                        id=log["id"],
+                        task_id=log["task"],
+                        timestamp=log["timestamp"],
+                        old_status=log["old_status"],
+                        new_status=log["new_status"],
+                    )
+                    for log in logs
+                )
+                # The chunk is every log past the cutoff up to its last id, which bounds the DELETE without
+                # listing the ids into more parameters than SQLite allows (999 before 3.32).
+                TaskStatusChangeLog.objects.filter(timestamp__lt=cutoff, id__lte=logs[-1]["id"]).delete()
+                # The cached status change lists of the users no longer match the hot table.
+                caching.invalidate(*(log["user"] for log in logs))
+            archived += len(logs)
+        purged = 0
+        orphaned = ArchivedTaskStatusChangeLog.objects.exclude(Exists(Task.objects.filter(id=OuterRef("task_id"))))
+        while True:
+            with transaction.atomic():
+                ids = list(orphaned.order_by("id").values_list("id", flat=True)[: options["chunk_size"]])
+                if not ids:
+                    break
+                orphaned.filter(id__lte=ids[-1]).delete()
+            purged += len(ids)
+        self.stdout.write(f"Archived {archived} status change logs, purged {purged} logs of deleted tasks.")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from tasks.models import TaskStatusChangeLogHistory, TaskStatusRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the task status rollups from every status change log, archived or not."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Number of logs read at a time.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # In order of time within each task, so that every log follows the one its task entered `old_status` at.
+            logs = (
+                TaskStatusChangeLogHistory.objects.order_by("task", "timestamp", "id")
+                .values("task", "timestamp", "old_status", "new_status", user=F("task__user"))
+                .iterator(chunk_size=options["chunk_size"])
+            )
+            rollups = TaskStatusRollup.accumulate(logs, {})
+            TaskStatusRollup.objects.all().delete()
+            TaskStatusRollup.objects.bulk_create(
+                (
+                    TaskStatusRollup(
+                        user_id=user_id,
+                        period=period,
+                        bucket=bucket,
+                        old_status=old_status,
+                        new_status=new_status,
+                        transitions=transitions,
+                        time_in_status=time_in_status,
+                        timed_transitions=timed_transitions,
+                    )
+                    for (user_id, period, bucket, old_status, new_status), (
+                        transitions,
+                        time_in_status,
+                        timed_transitions,
+                    ) in rollups.items()
+                ),
+                batch_size=options["chunk_size"],
+            )
+        self.stdout.write(f"Rebuilt {len(rollups)} task status rollups.")
@@ -0,0 +1,88 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from tasks.models import Task
+
+DUMMY_CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+def run_wsgi(user, path, requests, concurrency) -> list:
+    """Sends the requests through the WSGI handler from `concurrency` threads, like a threaded WSGI server."""
+
+    def send(index):
+        client = Client()
+        client.force_login(user)
+        statuses = [client.get(path).status_code for _ in range(index, requests, concurrency)]
+        connection.close()
+        return statuses
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return [status for statuses in executor.map(send, range(concurrency)) for status in statuses]
+
+
+def run_asgi(user, path, requests, concurrency) -> list:
+    """Sends the requests through the ASGI handler from `concurrency` coroutines on one event loop."""
+    client = AsyncClient()
+    client.force_login(user)
+
+    async def send(index):
+        return [(await client.get(path)).status_code for _ in range(index, requests, concurrency)]
+
+    async def main():
+        return await asyncio.gather(*(send(index) for index in range(concurrency)))
+
+    return [status for statuses in asyncio.run(main()) for status in statuses]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares requests per second of the task API served through the WSGI and the ASGI handlers in process, "
+        "including its async read endpoints. Creates a benchmark user with tasks and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Number of requests per endpoint.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Number of requests in flight.")
+        parser.add_argument("--tasks", type=int, default=200, help="Number of tasks of the benchmark user.")
+        parser.add_argument("--no-cache", action="store_true", help="Serve every request from the database.")
+
+    def handle(self, *args, **options):
+        # Committed rather than rolled back, as the requests are served from other threads and connections.
+        user = User.objects.create_user("benchmark-asgi")
+        try:
+            Task.objects.bulk_create(
+                Task(title=f"Task {priority}", description="", priority=priority, user=user)
+                for priority in range(1, options["tasks"] + 1)
+            )
+            Task.objects.filter(user=user).update(status=Task.Statuses.IN_PROGRESS)
+            runs = [
+                ("WSGI", run_wsgi, "/api/v1/tasks/"),
+                ("ASGI", run_asgi, "/api/v1/tasks/"),
+                ("ASGI", run_asgi, "/api/v1/async/tasks/"),
+                ("WSGI", run_wsgi, "/api/v1/task-status-changes/"),
+                ("ASGI", run_asgi, "/api/v1/task-status-changes/"),
+                ("ASGI", run_asgi, "/api/v1/async/task-status-changes/"),
+            ]
+            # The test clients send requests for the `testserver` host.
+            settings = {"ALLOWED_HOSTS": ["testserver"]}
+            if options["no_cache"]:
+                settings["CACHES"] = DUMMY_CACHES
+            with override_settings(**settings):
+                for handler, run, path in runs:
+                    start = perf_counter()
+                    statuses = run(user, path, options["requests"], options["concurrency"])
+                    elapsed = perf_counter() - start
+                    errors = sum(status != 200 for status in statuses)
+                    self.stdout.write(
+                        f"{handler} {path}: {len(statuses) / elapsed:.0f} requests/s "
+                        f"at concurrency {options['concurrency']}, {errors} errors"
+                    )
+        finally:
+            user.delete()
@@ -0,0 +1,48 @@
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from tasks.models import Task
+
+
+def loop_cascade(tasks, priority, task_id) -> int:
+    """The cascade `TaskFormViewMixin` used before `TaskQuerySet.cascade_priorities`, kept for comparison."""
+    deltas = []
+    for task in tasks.filter(completed=False, priority__gte=priority).exclude(id=task_id):
+        if task.priority != priority:
+            break
+        task.priority = priority = priority + 1
+        deltas.append(task)
+    return Task.objects.bulk_update(deltas, ["priority"])
+
+
+class Command(BaseCommand):
+    help = "Compares the in-database priority cascade against the previous Python loop. Changes are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=5000, help="Number of consecutive pending tasks.")
+
+    def handle(self, *args, **options):
+        cascades = {
+            "Python loop": lambda tasks: loop_cascade(tasks, 1, None),
+            "Single UPDATE": lambda tasks: tasks.cascade_priorities(1),
+        }
+        for name, cascade in cascades.items():
+            with transaction.atomic():
+                user = User.objects.create(username="benchmark-cascade")
+                Task.objects.bulk_create(
+                    Task(title=f"Task {priority}", description="", priority=priority, user=user)
+                    for priority in range(1, options["tasks"] + 1)
+                )
+                tasks = Task.objects.filter(user=user, deleted=False)
+                with CaptureQueriesContext(connection) as queries:
+                    start = perf_counter()
+                    shifted = cascade(tasks)
+                    elapsed = perf_counter() - start
+                self.stdout.write(
+                    f"{name}: shifted {shifted} tasks in {elapsed * 1000:.1f}ms with {len(queries)} queries"
+                )
+                transaction.set_rollback(True)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task, UserTaskStats
+
+
+class Command(BaseCommand):
+    help = "Recounts every user's task stats from their tasks, and fixes the ones that have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report the drifted stats.")
+
+    def handle(self, *args, **options):
+        expected = UserTaskStats.count_tasks(Task.objects.exclude(user=None))
+        stats = {stats.user_id: stats for stats in UserTaskStats.objects.all()}
+        drifted = 0
+        for user_id in sorted(expected.keys() | stats.keys()):
+            counts = expected.get(user_id, {})
+            current = stats.get(user_id)
+            fields = UserTaskStats.count_fields
+            if current is not None and all(getattr(current, field) == counts.get(field, 0) for field in fields):
+                continue
+            drifted += 1
+            if current is None:
+                self.stdout.write(f"User {user_id}: not counted yet")
+            else:
+                changes = ", ".join(
+                    f"{field} {getattr(current, field)} -> {counts.get(field, 0)}"
+                    for field in fields
+                    if getattr(current, field) != counts.get(field, 0)
+                )
+                self.stdout.write(f"User {user_id}: {changes}")
+            if not options["dry_run"]:
+                UserTaskStats.reconcile(user_id)
+        action = "Found" if options["dry_run"] else "Reconciled"
+        self.stdout.write(f"{action} {drifted} drifted task stats.")
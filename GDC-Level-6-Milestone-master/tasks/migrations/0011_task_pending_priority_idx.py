@@ -0,0 +1,17 @@
+# Generated by Django 4.0.1 on 2026-10-18 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_rename_taskstatuschangelogrecord_taskstatuschangelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed', False), ('deleted', False)), fields=['user', 'priority'], name='task_pending_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.1 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_task_pending_priority_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['user', 'completed', 'priority'], name='task_user_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskstatuschangelog',
+            index=models.Index(fields=['task', 'timestamp'], name='task_status_log_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.1 on 2026-10-18 09:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0013_task_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('deleted', models.IntegerField(default=0)),
+                ('pending_status', models.IntegerField(default=0)),
+                ('in_progress_status', models.IntegerField(default=0)),
+                ('completed_status', models.IntegerField(default=0)),
+                ('cancelled_status', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.1 on 2026-10-18 09:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0014_user_task_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('week', 'Week')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('old_status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=100)),
+                ('new_status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=100)),
+                ('transitions', models.IntegerField(default=0)),
+                ('time_in_status', models.FloatField(default=0)),
+                ('timed_transitions', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatusrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'period', 'bucket', 'old_status', 'new_status'), name='task_status_rollup_unique'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.0.1 on 2026-10-18 09:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+COLUMNS = 'id, task_id, "timestamp", old_status, new_status'
+
+CREATE_HISTORY_VIEW = f'''
+CREATE VIEW tasks_taskstatuschangeloghistory AS
+SELECT {COLUMNS} FROM tasks_taskstatuschangelog
+UNION ALL
+SELECT {COLUMNS} FROM tasks_archivedtaskstatuschangelog
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0015_task_status_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusChangeLogHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('timestamp', models.DateTimeField()),
+                ('old_status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=100)),
+                ('new_status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=100)),
+            ],
+            options={
+                'db_table': 'tasks_taskstatuschangeloghistory',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTaskStatusChangeLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('timestamp', models.DateTimeField()),
+                ('old_status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=100)),
+                ('new_status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=100)),
+                ('task', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tasks.task')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedtaskstatuschangelog',
+            index=models.Index(fields=['task', 'timestamp'], name='task_status_archive_ts_idx'),
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEW, 'DROP VIEW tasks_taskstatuschangeloghistory'),
+    ]
@@ -1,11 +1,239 @@
-from django.db import models
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import connection, connections, models, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Subquery, Value
 
 from django.contrib.auth.models import User
 
+from tasks import caching, events
+from tasks.search import get_search_backend, tokenize
+
+
+class TrackedFieldsMixin(models.Model):
+    """
+    Remembers the values of `tracked_fields` as they were loaded from (or last saved to) the DB,
+    so that changes can be detected on save without re-fetching the row.
+    """
+
+    tracked_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            field: value for field, value in zip(field_names, values) if field in cls.tracked_fields
+        }
+        return instance
+
+    def get_loaded_value(self, field):
+        """Returns the value of `field` as last seen in the DB. Raises `KeyError` if it isn't known."""
+        return self.__dict__.get("_loaded_values", {})[field]
+
+    def refresh_from_db(self, using=None, fields=None):
+        """Also takes the refreshed values as the loaded ones, including deferred fields loaded on access."""
+        super().refresh_from_db(using=using, fields=fields)
+        loaded_values = self.__dict__.setdefault("_loaded_values", {})
+        for field in self.tracked_fields:
+            refreshed = fields is None or field in fields or self._meta.get_field(field).name in fields
+            if field in self.__dict__ and refreshed:
+                loaded_values[field] = self.__dict__[field]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        loaded_values = self.__dict__.setdefault("_loaded_values", {})
+        for field in self.tracked_fields:
+            name = self._meta.get_field(field).name  # `update_fields` holds names, `user` rather than `user_id`.
+            if field in self.__dict__ and (update_fields is None or name in update_fields):
+                loaded_values[field] = self.__dict__[field]
+
+
+class TaskQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Updates the tasks, and when `status` is part of the update, logs every status change with a batched INSERT
+        and adds them to the status rollups. Updated titles and descriptions are reindexed for search, and the
+        event streams of the users are told to refresh their tasks.
+        """
+        with transaction.atomic(using=self.db):
+            # The tasks are locked before they are read, so that the counts and index entries taken from them
+            # match the rows the UPDATE writes.
+            if "status" in kwargs:
+                self.log_status_changes(kwargs)  # Locks the tasks as it reads them.
+            elif kwargs.keys() & {*Task.counted_fields, "title", "description"}:
+                self.lock()
+            user_ids = list(self.order_by().values_list("user_id", flat=True).distinct())
+            # The changes are read before the update with the queryset's own filter, which the tasks may no longer
+            # match afterwards, rather than by listing their ids into queries that would outgrow the parameter limit.
+            if kwargs.keys() & Task.counted_fields:
+                counts_before, counts_after = UserTaskStats.count_update(self, kwargs)
+            if kwargs.keys() & {"title", "description"}:
+                reindexed = [
+                    Task(id=task_id, title=title, description=description)
+                    for task_id, title, description in self.annotate_updates(kwargs, ["title", "description"])
+                    .order_by()
+                    .values_list("id", "updated_title", "updated_description")
+                ]
+            rows = super().update(**kwargs)
+            if kwargs.keys() & Task.counted_fields:
+                UserTaskStats.record_changes(counts_before, counts_after)
+            if kwargs.keys() & {"title", "description"}:
+                get_search_backend().index(reindexed)
+        caching.invalidate(*user_ids)
+        if kwargs.keys() - {"status"}:  # Status changes are published as they are logged.
+            for user_id in user_ids:
+                events.publish(user_id, "refresh", {})
+        return rows
 
-class Task(models.Model):
+    def lock(self) -> None:
+        """
+        Locks the rows of the tasks until the end of the transaction, streaming their ids rather than holding them.
+        Reads nothing on databases without row locks, such as SQLite, which locks the whole database to write.
+        """
+        if connections[self.db].features.has_select_for_update:
+            for _ in self.select_for_update().order_by().values_list("id").iterator():
+                pass
+
+    def log_status_changes(self, updates: dict) -> None:
+        """
+        Locks the tasks and logs the status changes `update(**updates)` is about to make, adding them to the status
+        rollups and publishing them. The tasks are read in order of id `TaskStatusRollup.lookup_batch_size` at a time,
+        each batch logged before the next is read, so the memory taken doesn't grow with the number of tasks.
+        """
+        tasks = self.annotate_updates(updates, ["status"]).select_for_update().order_by("id")
+        batch = tasks
+        while True:
+            locked = list(
+                batch.values_list("id", "status", "updated_status", "user_id")[: TaskStatusRollup.lookup_batch_size]
+            )
+            logs = TaskStatusChangeLog.objects.bulk_create(
+                TaskStatusChangeLog(task_id=task_id, old_status=old_status, new_status=new_status)
+                for task_id, old_status, new_status, _ in locked
+                if old_status != new_status
+            )
+            users = {task_id: user_id for task_id, _, _, user_id in locked}
+            TaskStatusRollup.record(logs, users)
+            events.publish_status_changes(logs, users)
+            if len(locked) < TaskStatusRollup.lookup_batch_size:
+                return
+            batch = tasks.filter(id__gt=locked[-1][0])
+
+    def annotate_updates(self, updates: dict, fields):
+        """
+        Annotates the tasks with the `updated_<field>` value each of `fields` would have after `update(**updates)`,
+        by evaluating the values and expressions of the update (e.g. the `Case` built by `bulk_update`) on the
+        current rows, as the UPDATE itself does.
+        """
+        annotations = {}
+        for field in fields:
+            value = updates.get(field, F(field))
+            if not hasattr(value, "resolve_expression"):
+                value = Value(getattr(value, "pk", value), output_field=self.model._meta.get_field(field))
+            annotations[f"updated_{field}"] = value
+        return self.annotate(**annotations)
+
+    def search(self, query: str):
+        """
+        Filters down to the tasks with every word of `query` in their title or description, annotated
+        with their `search_rank` (lower is more relevant). A query without words filters nothing out.
+        """
+        if not tokenize(query):
+            return self
+        return get_search_backend().search(self, query)
+
+    def reindex(self) -> None:
+        """Refreshes the search index entries of the tasks, for writes that bypass the model signals."""
+        get_search_backend().index(list(self.only("id", "title", "description").order_by()))
+
+    def cascade_priorities(self, priority: int, exclude_id=None) -> int:
+        """
+        Makes room for a pending task at `priority` by shifting the consecutive run of pending tasks
+        starting at `priority` one step down, in a single UPDATE. Returns the number of tasks shifted.
+        The caller is left to invalidate the cached task lists of the user.
+        """
+        tasks = self.filter(completed=False).exclude(id=exclude_id)
+        # The run ends at the first task that has no task right after it.
+        end = (
+            tasks.filter(priority__gte=priority)
+            .exclude(Exists(tasks.filter(priority=OuterRef("priority") + 1)))
+            .order_by("priority")
+            .values("priority")[:1]
+        )
+        shifted = tasks.filter(
+            Exists(tasks.filter(priority=priority)), priority__gte=priority, priority__lte=Subquery(end)
+        ).order_by()
+        # Skips the bookkeeping of `update`, which would cost a query to find whose cache to invalidate.
+        return models.QuerySet.update(shifted, priority=F("priority") + 1)
+
+    def resolve_priorities(self, tasks) -> list:
+        """
+        Places the pending `tasks` in order the way `cascade_priorities` would place each of them in turn, but in
+        memory after a single SELECT. `tasks` may mix new tasks with tasks of this queryset, of which those keeping
+        their pending priority stay put. Returns the other pending tasks of this queryset that had to be shifted.
+        """
+        batch = {task.id: task for task in tasks if task.id is not None}
+        slots, settled, loaded = {}, set(), {}
+        for task in self.filter(completed=False).only("id", "priority").order_by():
+            if task.id in batch:
+                if batch[task.id].completed or batch[task.id].priority != task.priority:
+                    continue  # Vacates its slot, to be placed again below if still pending.
+                settled.add(task.id)
+                task = batch[task.id]
+            else:
+                loaded[task.id] = task.priority
+            slots[task.priority] = task
+        for task in tasks:
+            if task.completed or task.id in settled:
+                continue
+            priority = task.priority
+            while task is not None:
+                task.priority = priority
+                task, slots[priority] = slots.get(priority), task
+                priority += 1
+        return [task for task in slots.values() if task.id in loaded and task.priority != loaded[task.id]]
+
+    def seek(self, fields, values, lookup: str):
+        """
+        Filters down to the tasks ordered after (`gt`) or before (`lt`) `values` on `fields`, the keyset pagination
+        equivalent of the row value comparison `(fields) > (values)`.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(fields, values):
+            condition |= Q(**equal, **{f"{field}__{lookup}": value})
+            equal[field] = value
+        return self.filter(condition)
+
+
+class Task(TrackedFieldsMixin, models.Model):
     class Meta:
         ordering = ("completed", "priority")
+        indexes = [
+            # Backs the listings of a user's tasks, which filter on `user` and `deleted=False` and sort by `ordering`.
+            models.Index(
+                fields=["user", "completed", "priority"],
+                condition=models.Q(deleted=False),
+                name="task_user_listing_idx",
+            ),
+            # Backs the run lookup of `TaskQuerySet.cascade_priorities`. Boolean filters compile to `NOT "completed"`
+            # rather than an equality, so a seek on `priority` needs `completed` in the condition instead of the key.
+            models.Index(
+                fields=["user", "priority"],
+                condition=models.Q(deleted=False, completed=False),
+                name="task_pending_priority_idx",
+            ),
+        ]
+
+    tracked_fields = ("status", "title", "description", "user_id", "completed", "deleted")
+
+    counted_fields = ("user", "completed", "deleted", "status")
+    """The fields that `UserTaskStats` counts tasks by."""
+
+    objects = TaskQuerySet.as_manager()
 
     class Statuses(models.TextChoices):
         PENDING = "Pending", "Pending"
@@ -43,10 +271,33 @@ class Task(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Writes the status change log and the user's task stats in the same transaction as the task.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+    @staticmethod
+    def get_status_counts(user) -> dict:
+        """
+        Returns the number of `total` and `completed` tasks of the user, read from their task stats
+        and cached until one of their tasks is written.
+        """
+
+        def get_counts():
+            stats = UserTaskStats.get_for_user(user.id)
+            return {"total": stats.total, "completed": stats.completed}
+
+        return caching.get_or_set(user.id, "status-counts", "", get_counts)
+
 
 class TaskStatusChangeLog(models.Model):
     """Model class for task status change event records."""
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["task", "timestamp"], name="task_status_log_timestamp_idx"),
+        ]
+
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
     """The task this status change log is associated to."""
 
@@ -58,3 +309,339 @@ class TaskStatusChangeLog(models.Model):
 
     new_status = models.CharField(max_length=100, choices=Task.Statuses.choices)
     """The new status the task is updated to."""
+
+
+class ArchivedTaskStatusChangeLog(models.Model):
+    """
+    Model class for the status change logs moved out of `TaskStatusChangeLog` by the `archive_status_changes`
+    command, once older than the `TASK_STATUS_LOG_RETENTION_DAYS` setting.
+    """
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["task", "timestamp"], name="task_status_archive_ts_idx"),
+        ]
+
+    id = models.BigIntegerField(primary_key=True)
+    """The id the log had before it was archived."""
+
+    # Deleting a task leaves its archived logs behind rather than cascading into the archive,
+    # they are purged by the `archive_status_changes` command instead.
+    task = models.ForeignKey(Task, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    """The task this status change log is associated to."""
+
+    timestamp = models.DateTimeField()
+    """The timestamp when the status change event occurred."""
+
+    old_status = models.CharField(max_length=100, choices=Task.Statuses.choices)
+    """The status of the task before updating the new status."""
+
+    new_status = models.CharField(max_length=100, choices=Task.Statuses.choices)
+    """The new status the task is updated to."""
+
+
+class TaskStatusChangeLogHistory(models.Model):
+    """
+    Read only model class for every status change log, hot or archived, backed by a view over both tables
+    created by the `0016_task_status_log_archive` migration.
+    """
+
+    class Meta:
+        managed = False
+        db_table = "tasks_taskstatuschangeloghistory"
+
+    id = models.BigIntegerField(primary_key=True)
+
+    task = models.ForeignKey(Task, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    """The task this status change log is associated to."""
+
+    timestamp = models.DateTimeField()
+    """The timestamp when the status change event occurred."""
+
+    old_status = models.CharField(max_length=100, choices=Task.Statuses.choices)
+    """The status of the task before updating the new status."""
+
+    new_status = models.CharField(max_length=100, choices=Task.Statuses.choices)
+    """The new status the task is updated to."""
+
+
+class TaskStatusRollup(models.Model):
+    """
+    Model class for the number of status changes of a user's tasks within an hour, day or week, kept up to date
+    as status change logs are written and rebuilt from them by the `backfill_status_rollups` command.
+    """
+
+    class Periods(models.TextChoices):
+        HOUR = "hour", "Hour"
+        DAY = "day", "Day"
+        WEEK = "week", "Week"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "period", "bucket", "old_status", "new_status"], name="task_status_rollup_unique"
+            ),
+        ]
+
+    lookup_batch_size = 500
+    """The number of tasks looked up per query, well within the parameter limit of SQLite (999 before 3.32)."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    """The user whose tasks changed status."""
+
+    period = models.CharField(max_length=10, choices=Periods.choices)
+    """The length of the time bucket."""
+
+    bucket = models.DateTimeField()
+    """The start of the time bucket, in UTC. Weeks start on Monday."""
+
+    old_status = models.CharField(max_length=100, choices=Task.Statuses.choices)
+    """The status the tasks changed from."""
+
+    new_status = models.CharField(max_length=100, choices=Task.Statuses.choices)
+    """The status the tasks changed to."""
+
+    transitions = models.IntegerField(default=0)
+    """The number of status changes."""
+
+    time_in_status = models.FloatField(default=0)
+    """The total seconds the tasks had spent in `old_status`, over the `timed_transitions`."""
+
+    timed_transitions = models.IntegerField(default=0)
+    """
+    The number of status changes for which the time spent in `old_status` is known, which are those
+    with an earlier status change log of the task to tell when it entered `old_status`.
+    """
+
+    @classmethod
+    def get_bucket(cls, period: str, timestamp):
+        """Returns the start of the bucket of `period` that `timestamp` falls in."""
+        if period == cls.Periods.HOUR:
+            return timestamp.replace(minute=0, second=0, microsecond=0)
+        day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+        if period == cls.Periods.DAY:
+            return day
+        return day - timedelta(days=day.weekday())
+
+    @classmethod
+    def accumulate(cls, logs, entered: dict) -> dict:
+        """
+        Adds up `logs`, dicts with the `user`, `task`, `timestamp`, `old_status` and `new_status` of status changes
+        in order of time, into the `[transitions, time_in_status, timed_transitions]` of each rollup they fall in.
+        `entered` maps task ids to when they entered the status they leave in their first log, and is moved along.
+        """
+        rollups = defaultdict(lambda: [0, 0.0, 0])
+        for log in logs:
+            since = entered.get(log["task"])
+            entered[log["task"]] = log["timestamp"]
+            if log["user"] is None:
+                continue
+            for period in cls.Periods.values:
+                key = (
+                    log["user"],
+                    period,
+                    cls.get_bucket(period, log["timestamp"]),
+                    log["old_status"],
+                    log["new_status"],
+                )
+                rollup = rollups[key]
+                rollup[0] += 1
+                if since is not None:
+                    rollup[1] += (log["timestamp"] - since).total_seconds()
+                    rollup[2] += 1
+        return rollups
+
+    @classmethod
+    def record(cls, logs, users: dict) -> None:
+        """
+        Adds newly written status change logs to the rollups, `users` mapping the ids of their tasks to the ids
+        of their users. Takes a query per `lookup_batch_size` tasks to find when they entered their previous status,
+        and one upsert.
+        """
+        if not logs:
+            return
+        logs = sorted(logs, key=lambda log: log.timestamp)
+        task_ids = list({log.task_id for log in logs})
+        entered = {}
+        for start in range(0, len(task_ids), cls.lookup_batch_size):
+            entered.update(
+                TaskStatusChangeLogHistory.objects.filter(
+                    task_id__in=task_ids[start : start + cls.lookup_batch_size], timestamp__lt=logs[0].timestamp
+                )
+                .order_by()
+                .values_list("task")
+                .annotate(Max("timestamp"))
+            )
+        rollups = cls.accumulate(
+            (
+                {
+                    "user": users[log.task_id],
+                    "task": log.task_id,
+                    "timestamp": log.timestamp,
+                    "old_status": log.old_status,
+                    "new_status": log.new_status,
+                }
+                for log in logs
+            ),
+            entered,
+        )
+        cls.upsert(rollups)
+
+    @classmethod
+    def upsert(cls, rollups: dict) -> None:
+        """Adds the accumulated counts to the rollup rows, creating the rows that don't exist yet."""
+        if connection.vendor in ("sqlite", "postgresql"):
+            # Django 4.0's `bulk_create` can't update on conflict, so both databases get the same upsert.
+            table = cls._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {table} (user_id, period, bucket, old_status, new_status, transitions, "
+                    f"time_in_status, timed_transitions) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+                    f"ON CONFLICT (user_id, period, bucket, old_status, new_status) DO UPDATE SET "
+                    f"transitions = {table}.transitions + excluded.transitions, "
+                    f"time_in_status = {table}.time_in_status + excluded.time_in_status, "
+                    f"timed_transitions = {table}.timed_transitions + excluded.timed_transitions",
+                    [
+                        [
+                            user_id,
+                            period,
+                            cls._meta.get_field("bucket").get_db_prep_value(bucket, connection),
+                            old_status,
+                            new_status,
+                            *counts,
+                        ]
+                        for (user_id, period, bucket, old_status, new_status), counts in rollups.items()
+                    ],
+                )
+            return
+        for (user_id, period, bucket, old_status, new_status), counts in rollups.items():
+            transitions, time_in_status, timed_transitions = counts
+            rollup, created = cls.objects.select_for_update().get_or_create(
+                user_id=user_id, period=period, bucket=bucket, old_status=old_status, new_status=new_status
+            )
+            rollup.transitions = F("transitions") + transitions
+            rollup.time_in_status = F("time_in_status") + time_in_status
+            rollup.timed_transitions = F("timed_transitions") + timed_transitions
+            rollup.save(update_fields=["transitions", "time_in_status", "timed_transitions"])
+
+
+class UserTaskStats(models.Model):
+    """
+    Model class for the denormalized counts of a user's tasks, kept up to date with every task write
+    by the task signals and `TaskQuerySet.update`.
+    """
+
+    status_fields = {
+        Task.Statuses.PENDING: "pending_status",
+        Task.Statuses.IN_PROGRESS: "in_progress_status",
+        Task.Statuses.COMPLETED: "completed_status",
+        Task.Statuses.CANCELLED: "cancelled_status",
+    }
+
+    count_fields = ("total", "completed", "deleted", *status_fields.values())
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="task_stats")
+    """The user whose tasks are counted."""
+
+    total = models.IntegerField(default=0)
+    """The number of tasks that aren't deleted."""
+
+    completed = models.IntegerField(default=0)
+    """The number of completed tasks that aren't deleted."""
+
+    deleted = models.IntegerField(default=0)
+    """The number of (soft) deleted tasks."""
+
+    pending_status = models.IntegerField(default=0)
+    """The number of tasks that aren't deleted in the `Pending` status."""
+
+    in_progress_status = models.IntegerField(default=0)
+    """The number of tasks that aren't deleted in the `In Progress` status."""
+
+    completed_status = models.IntegerField(default=0)
+    """The number of tasks that aren't deleted in the `Completed` status."""
+
+    cancelled_status = models.IntegerField(default=0)
+    """The number of tasks that aren't deleted in the `Cancelled` status."""
+
+    @property
+    def pending(self) -> int:
+        """The number of tasks that are neither completed nor deleted."""
+        return self.total - self.completed
+
+    @classmethod
+    def count(cls, values) -> dict:
+        """Returns the counts a task with the given `Task.counted_fields` values adds to the stats of its user."""
+        if values["deleted"]:
+            return {"deleted": 1}
+        return {"total": 1, "completed": int(values["completed"]), cls.status_fields[values["status"]]: 1}
+
+    @classmethod
+    def count_tasks(cls, tasks) -> dict:
+        """Returns the counts of `tasks` by user id, counted with a single query."""
+        live = Q(deleted=False)
+        counts = {
+            "total": Count("id", filter=live),
+            "completed": Count("id", filter=live & Q(completed=True)),
+            "deleted": Count("id", filter=Q(deleted=True)),
+            **{field: Count("id", filter=live & Q(status=status)) for status, field in cls.status_fields.items()},
+        }
+        # Prefixed, as annotations can't share the names of the `completed` and `deleted` fields.
+        rows = tasks.order_by().values("user").annotate(**{f"count_{field}": count for field, count in counts.items()})
+        return {row["user"]: {field: row[f"count_{field}"] for field in counts} for row in rows}
+
+    @classmethod
+    def count_update(cls, tasks, updates: dict) -> tuple:
+        """
+        Returns the counts of `tasks` by user id before and after `tasks.update(**updates)`, counted with a single
+        query before the update over the distinct combinations of their `Task.counted_fields`.
+        """
+        fields = Task.counted_fields
+        groups = (
+            tasks.annotate_updates(updates, fields)
+            .order_by()
+            .values(*fields, *(f"updated_{field}" for field in fields))
+            .annotate(count=Count("id"))
+        )
+        counts_before, counts_after = defaultdict(Counter), defaultdict(Counter)
+        for group in groups:
+            before = {field: group[field] for field in fields}
+            after = {field: group[f"updated_{field}"] for field in fields}
+            for counts, values in ((counts_before, before), (counts_after, after)):
+                for field, count in cls.count(values).items():
+                    counts[values["user"]][field] += count * group["count"]
+        return counts_before, counts_after
+
+    @classmethod
+    def record_changes(cls, counts_before: dict, counts_after: dict) -> None:
+        """
+        Moves the stats of each user from the `counts_before` to the `counts_after` of their changed tasks.
+        Stats missing for users who only lose tasks are left to `get_for_user`, rather than recreated
+        for a user whose deletion is cascading to their tasks.
+        """
+        changes = defaultdict(Counter)
+        for user_id, counts in counts_before.items():
+            changes[user_id].subtract(counts)
+        for user_id, counts in counts_after.items():
+            changes[user_id].update(counts)
+        for user_id, counts in changes.items():
+            counts = {field: change for field, change in counts.items() if change}
+            if user_id is None or not counts:
+                continue
+            updates = {field: F(field) + change for field, change in counts.items()}
+            # Stats recreated for a user who only loses tasks would break the foreign key at commit
+            # when the tasks are being deleted along with their user.
+            if not cls.objects.filter(user_id=user_id).update(**updates) and user_id in counts_after:
+                cls.reconcile(user_id)  # Counts the changes too, as they are already written.
+
+    @classmethod
+    def reconcile(cls, user_id):
+        """Recounts the stats of the user from their tasks, and returns them."""
+        counts = cls.count_tasks(Task.objects.filter(user_id=user_id)).get(user_id, {})
+        defaults = {field: counts.get(field, 0) for field in cls.count_fields}
+        return cls.objects.update_or_create(user_id=user_id, defaults=defaults)[0]
+
+    @classmethod
+    def get_for_user(cls, user_id):
+        """Returns the stats of the user, with a single primary key lookup once they have been counted."""
+        return cls.objects.filter(user_id=user_id).first() or cls.reconcile(user_id)
@@ -0,0 +1,178 @@
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+
+def tokenize(text: str) -> list:
+    """Splits text into the lowercase words that are indexed and searched for."""
+    return re.findall(r"\w+", text.lower())
+
+
+class SearchBackend(ABC):
+    """
+    Full-text index over the title and description of tasks, kept in sync by the task signals.
+    Matches every word of a query as a prefix and ranks by BM25, lower `search_rank` being more relevant.
+    """
+
+    @abstractmethod
+    def index(self, tasks) -> None:
+        """Adds the tasks to the index, replacing any previous entries of theirs."""
+
+    @abstractmethod
+    def remove(self, task_id) -> None:
+        """Drops the entries of the task from the index."""
+
+    @abstractmethod
+    def search(self, queryset, query: str):
+        """Filters `queryset` down to the matching tasks, annotated with their `search_rank`."""
+
+
+class FTS5SearchBackend(SearchBackend):
+    """Searches the SQLite FTS5 table created by the `0013_task_search_index` migration."""
+
+    table = "tasks_task_fts"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return connection.vendor == "sqlite" and cls.table in connection.introspection.table_names()
+
+    def index(self, tasks) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [[task.id] for task in tasks])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)",
+                [[task.id, task.title, task.description] for task in tasks],
+            )
+
+    def remove(self, task_id) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [task_id])
+
+    def search(self, queryset, query: str):
+        # Quoting every word keeps FTS5 query syntax in the input from being interpreted.
+        match = " ".join(f'"{word}"*' for word in tokenize(query))
+        table, column = self.table, f'"{queryset.model._meta.db_table}"."id"'
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [match])).annotate(
+            search_rank=RawSQL(f"SELECT rank FROM {table} WHERE {table} MATCH %s AND rowid = {column}", [match])
+        )
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+    """
+    An in-process inverted index, for databases without a full-text index of their own. It is loaded from the
+    database on first use and only sees the writes of its own process from then on.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = defaultdict(dict)  # word -> {task id: occurrences}
+        self.words = []  # The indexed words in order, for prefix lookups.
+        self.documents = {}  # task id -> its words
+        self.loaded = False
+
+    def load(self, model) -> None:
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            for task_id, title, description in model.objects.values_list("id", "title", "description"):
+                self.add(task_id, f"{title} {description}")
+
+    def add(self, task_id, text) -> None:
+        words = self.documents[task_id] = tokenize(text)
+        for word in words:
+            if word not in self.postings:
+                insort(self.words, word)
+            self.postings[word][task_id] = self.postings[word].get(task_id, 0) + 1
+
+    def index(self, tasks) -> None:
+        with self.lock:
+            for task in tasks:
+                self.load(type(task))
+                self.remove(task.id)
+                self.add(task.id, f"{task.title} {task.description}")
+
+    def remove(self, task_id) -> None:
+        with self.lock:
+            for word in set(self.documents.pop(task_id, ())):
+                del self.postings[word][task_id]
+                if not self.postings[word]:
+                    del self.postings[word]
+                    self.words.pop(bisect_left(self.words, word))
+
+    def expand(self, prefix) -> list:
+        start = bisect_left(self.words, prefix)
+        end = start
+        while end < len(self.words) and self.words[end].startswith(prefix):
+            end += 1
+        return self.words[start:end]
+
+    def rank(self, query: str, candidates=None) -> dict:
+        """
+        Returns the BM25 scores of the tasks matching every word of `query`, negated like FTS5's. Only the tasks
+        with ids in `candidates` are scored when given, though the statistics still cover every task like FTS5's.
+        """
+        with self.lock:
+            if not self.documents:
+                return {}
+            average_length = sum(len(words) for words in self.documents.values()) / len(self.documents)
+            scores = None
+            for prefix in tokenize(query):
+                word_scores = defaultdict(float)
+                for word in self.expand(prefix):
+                    postings = self.postings[word]
+                    idf = math.log(1 + (len(self.documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for task_id, occurrences in postings.items():
+                        if candidates is not None and task_id not in candidates:
+                            continue
+                        norm = self.k1 * (1 - self.b + self.b * len(self.documents[task_id]) / average_length)
+                        word_scores[task_id] -= idf * occurrences * (self.k1 + 1) / (occurrences + norm)
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {
+                        task_id: score + word_scores[task_id]
+                        for task_id, score in scores.items()
+                        if task_id in word_scores
+                    }
+            return scores or {}
+
+    def search(self, queryset, query: str):
+        self.load(queryset.model)
+        # Scoring only the tasks of `queryset` keeps the filter and ranking SQL below to the size of its matches,
+        # rather than growing with the matching tasks of every user.
+        scores = self.rank(query, set(queryset.order_by().values_list("id", flat=True)))
+        if not scores:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        return queryset.filter(id__in=list(scores)).annotate(
+            search_rank=Case(
+                *(When(id=task_id, then=Value(score)) for task_id, score in scores.items()), output_field=FloatField()
+            )
+        )
+
+
+@lru_cache(maxsize=None)
+def get_search_backend() -> SearchBackend:
+    """
+    Returns the backend named by the `TASKS_SEARCH_BACKEND` setting, or else FTS5 where the database has it
+    and the in-process inverted index otherwise.
+    """
+    backend = getattr(settings, "TASKS_SEARCH_BACKEND", None)
+    if backend is not None:
+        return import_string(backend)()
+    if FTS5SearchBackend.is_available():
+        return FTS5SearchBackend()
+    return InvertedIndexSearchBackend()
@@ -1,7 +1,18 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from tasks.models import Task, TaskStatusChangeLog
+from tasks import caching, events
+from tasks.apiviews import TaskSerializer
+from tasks.models import Task, TaskStatusChangeLog, TaskStatusRollup, UserTaskStats
+from tasks.search import get_search_backend
+
+COUNTED_ATTNAMES = {field: Task._meta.get_field(field).attname for field in Task.counted_fields}
+
+EVENT_TASK_FIELDS = [field for field in TaskSerializer.Meta.fields if field != "user"]
+
+
+def get_counted_values(instance: Task) -> dict:
+    return {attname: getattr(instance, attname) for attname in COUNTED_ATTNAMES.values()}
 
 
 @receiver(pre_save, sender=Task)
@@ -11,10 +22,109 @@ def on_task_update(sender, instance: Task, **kwargs) -> None:
     """
     if instance.id is None:  # New instance being created.
         return
-    previous: Task = Task.objects.get(id=instance.id)
-    if previous.status != instance.status:
-        TaskStatusChangeLog.objects.create(
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and not set(Task.counted_fields) & set(update_fields):
+        return
+    try:
+        saved = {attname: instance.get_loaded_value(attname) for attname in COUNTED_ATTNAMES.values()}
+    except KeyError:  # Not loaded from the DB, e.g. constructed with an existing id.
+        saved = Task.objects.filter(id=instance.id).values(*COUNTED_ATTNAMES.values()).first()
+    if saved is None:
+        return
+    # Picked up by `on_task_save_stats` once the task is written.
+    instance.__dict__["_saved_counted_values"] = saved
+    if saved["status"] != instance.status and (update_fields is None or "status" in update_fields):
+        log = TaskStatusChangeLog.objects.create(
             task=instance,
-            old_status=previous.status,
+            old_status=saved["status"],
             new_status=instance.status,
         )
+        TaskStatusRollup.record([log], {instance.id: saved["user_id"]})
+        events.publish_status_changes([log], {instance.id: saved["user_id"]})
+
+
+@receiver(post_save, sender=Task)
+def on_task_save_stats(sender, instance: Task, created: bool, update_fields=None, **kwargs) -> None:
+    """
+    Invoked whenever a Task is saved, to move the task stats of its user from its saved to its new values.
+    """
+    saved = instance.__dict__.pop("_saved_counted_values", None)
+    if not created and saved is None:
+        return
+    values = get_counted_values(instance)
+    if update_fields is not None:  # The fields left out keep their saved values.
+        for field, attname in COUNTED_ATTNAMES.items():
+            if field not in update_fields:
+                values[attname] = saved[attname]
+    UserTaskStats.record_changes(
+        {saved["user_id"]: UserTaskStats.count(saved)} if saved else {},
+        {values["user_id"]: UserTaskStats.count(values)},
+    )
+
+
+@receiver(post_delete, sender=Task)
+def on_task_delete_stats(sender, instance: Task, **kwargs) -> None:
+    """
+    Invoked whenever a Task is deleted, to take it out of the task stats of its user.
+    """
+    values = get_counted_values(instance)
+    UserTaskStats.record_changes({values["user_id"]: UserTaskStats.count(values)}, {})
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def on_task_write(sender, instance: Task, **kwargs) -> None:
+    """
+    Invoked whenever a Task is saved or deleted, to drop the cached task lists and counts of its user once the
+    write commits.
+    """
+    caching.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Task)
+def on_task_save_index(sender, instance: Task, **kwargs) -> None:
+    """
+    Invoked whenever a Task is saved, to keep its search index entry in sync with its title and description.
+    """
+    if not kwargs["created"]:
+        try:
+            if all(instance.get_loaded_value(field) == getattr(instance, field) for field in ("title", "description")):
+                return
+        except KeyError:  # Not loaded from the DB, so it may have changed.
+            pass
+    get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Task)
+def on_task_delete_index(sender, instance: Task, **kwargs) -> None:
+    """
+    Invoked whenever a Task is deleted, to drop its search index entry.
+    """
+    get_search_backend().remove(instance.id)
+
+
+@receiver(post_save, sender=Task)
+def on_task_save_event(sender, instance: Task, created: bool, **kwargs) -> None:
+    """
+    Invoked whenever a Task is saved, to push it to the event streams of its user, and of its previous user
+    when it changed hands.
+    """
+    try:
+        previous_user_id = instance.get_loaded_value("user_id")  # Not yet moved on to the saved values.
+    except KeyError:
+        previous_user_id = instance.user_id
+    if previous_user_id != instance.user_id:
+        events.publish(previous_user_id, "delete", {"id": instance.id})
+    if instance.deleted:
+        events.publish(instance.user_id, "delete", {"id": instance.id})
+    else:
+        data = {"created": created, "task": TaskSerializer(instance, fields=EVENT_TASK_FIELDS).data}
+        events.publish(instance.user_id, "task", data)
+
+
+@receiver(post_delete, sender=Task)
+def on_task_delete_event(sender, instance: Task, **kwargs) -> None:
+    """
+    Invoked whenever a Task is deleted, to push its deletion to the event streams of its user.
+    """
+    events.publish(instance.user_id, "delete", {"id": instance.id})
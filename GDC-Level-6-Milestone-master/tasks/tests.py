@@ -1 +1,983 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+
+from task_manager.asgi import application
+from tasks import caching, events
+from tasks.apiviews import TaskCursorPagination, TaskEventsView, TaskViewSet
+from tasks.models import ArchivedTaskStatusChangeLog, Task, TaskStatusChangeLog, TaskStatusRollup, UserTaskStats
+from tasks.search import FTS5SearchBackend, InvertedIndexSearchBackend, get_search_backend
+from tasks.views import AllTaskView, CompletedTaskView, PendingTaskView
+
+
+class TaskStatusChangeLogTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tester", password="password")
+        self.tasks = [
+            Task.objects.create(title=f"Task {priority}", description="", priority=priority, user=self.user)
+            for priority in range(3)
+        ]
+
+    def test_save_logs_status_change_without_refetching(self):
+        task = Task.objects.get(id=self.tasks[0].id)
+        task.status = Task.Statuses.IN_PROGRESS
+        # The log INSERT, the lookup of the previous log and the upsert of the status rollups,
+        # the task UPDATE and the user's task stats UPDATE.
+        with self.assertNumQueries(5):
+            task.save()
+        task.status = Task.Statuses.COMPLETED
+        task.save()
+        self.assertEqual(
+            list(TaskStatusChangeLog.objects.order_by("id").values_list("old_status", "new_status")),
+            [
+                (Task.Statuses.PENDING, Task.Statuses.IN_PROGRESS),
+                (Task.Statuses.IN_PROGRESS, Task.Statuses.COMPLETED),
+            ],
+        )
+
+    def test_save_without_status_change_is_not_logged(self):
+        task = Task.objects.get(id=self.tasks[0].id)
+        task.title = "Renamed"
+        task.save()
+        self.assertFalse(TaskStatusChangeLog.objects.exists())
+
+    def test_save_after_refresh_logs_the_refreshed_status(self):
+        task = Task.objects.get(id=self.tasks[0].id)
+        Task.objects.filter(id=task.id).update(status=Task.Statuses.IN_PROGRESS)
+        task.refresh_from_db()
+        task.status = Task.Statuses.COMPLETED
+        task.save()
+        self.assertEqual(TaskStatusChangeLog.objects.order_by("id").last().old_status, Task.Statuses.IN_PROGRESS)
+        deferred = Task.objects.only("title").get(id=task.id)
+        self.assertEqual(deferred.status, Task.Statuses.COMPLETED)  # Loaded through `refresh_from_db`.
+        self.assertEqual(deferred.get_loaded_value("status"), Task.Statuses.COMPLETED)
+
+    def test_queryset_update_logs_changes_in_bulk(self):
+        Task.objects.filter(id=self.tasks[0].id).update(status=Task.Statuses.COMPLETED)
+        Task.objects.filter(user=self.user).update(status=Task.Statuses.COMPLETED)
+        self.assertEqual(TaskStatusChangeLog.objects.count(), 3)
+        self.assertEqual(TaskStatusChangeLog.objects.filter(old_status=Task.Statuses.COMPLETED).count(), 0)
+
+    def test_queryset_update_logs_changes_in_batches(self):
+        Task.objects.filter(id=self.tasks[0].id).update(status=Task.Statuses.COMPLETED)
+        with mock.patch.object(TaskStatusRollup, "lookup_batch_size", 2), CaptureQueriesContext(connection) as queries:
+            Task.objects.filter(user=self.user).update(status=Task.Statuses.CANCELLED)
+        # A full batch of two tasks, and the last task.
+        self.assertEqual(sum(query["sql"].endswith("LIMIT 2") for query in queries), 2)
+        self.assertEqual(
+            set(
+                TaskStatusChangeLog.objects.filter(new_status=Task.Statuses.CANCELLED).values_list(
+                    "task_id", "old_status"
+                )
+            ),
+            {
+                (self.tasks[0].id, Task.Statuses.COMPLETED),
+                *((task.id, Task.Statuses.PENDING) for task in self.tasks[1:]),
+            },
+        )
+        self.assertEqual(
+            TaskStatusRollup.objects.get(
+                period=TaskStatusRollup.Periods.DAY,
+                new_status=Task.Statuses.CANCELLED,
+                old_status=Task.Statuses.PENDING,
+            ).transitions,
+            2,
+        )
+
+    def test_bulk_update_logs_changes(self):
+        for task in self.tasks[:2]:
+            task.status = Task.Statuses.CANCELLED
+        Task.objects.bulk_update(self.tasks, ["status"])
+        self.assertEqual(
+            set(TaskStatusChangeLog.objects.values_list("task_id", "new_status")),
+            {(task.id, Task.Statuses.CANCELLED) for task in self.tasks[:2]},
+        )
+
+
+class TaskPriorityCascadeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tester", password="password")
+        for priority in [1, 2, 3, 5]:
+            Task.objects.create(title=f"Task {priority}", description="", priority=priority, user=self.user)
+        Task.objects.create(title="Done", description="", priority=4, completed=True, user=self.user)
+        self.tasks = Task.objects.filter(user=self.user, deleted=False)
+
+    def pending_priorities(self):
+        return list(self.tasks.filter(completed=False).values_list("priority", flat=True))
+
+    def test_shifts_only_the_consecutive_run(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.tasks.cascade_priorities(2), 2)
+        self.assertEqual(self.pending_priorities(), [1, 3, 4, 5])
+
+    def test_free_priority_shifts_nothing(self):
+        self.assertEqual(self.tasks.cascade_priorities(4), 0)
+        self.assertEqual(self.tasks.cascade_priorities(0), 0)
+        self.assertEqual(self.pending_priorities(), [1, 2, 3, 5])
+
+    def test_create_view_cascades(self):
+        self.client.login(username="tester", password="password")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                "/create-task/", {"title": "New task", "description": "New", "priority": 1, "status": "Pending"}
+            )
+        # The cascade and the new task are written once each.
+        writes = [query["sql"].split(" (")[0] for query in queries if query["sql"].startswith(("INSERT", "UPDATE"))]
+        self.assertEqual(writes.count('INSERT INTO "tasks_task"'), 1)
+        self.assertEqual(sum(write.startswith('UPDATE "tasks_task"') for write in writes), 1)
+        self.assertEqual(self.pending_priorities(), [1, 2, 3, 4, 5])
+        self.assertEqual(self.tasks.get(priority=1).title, "New task")
+        self.assertEqual(self.tasks.get(priority=4, completed=False).title, "Task 3")
+
+
+class TaskStatusDescriptionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        for priority, completed, deleted in [(1, False, False), (2, True, False), (3, False, False), (4, True, True)]:
+            Task.objects.create(
+                title="Task", description="", priority=priority, completed=completed, deleted=deleted, user=self.user
+            )
+        request = RequestFactory().get("/")
+        request.user = self.user
+        self.view = AllTaskView()
+        self.view.setup(request)
+
+    def test_counts_are_aggregated_once_and_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.view.get_tasks_status_description(), "1 of 3 completed")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.view.get_tasks_status_description(), "1 of 3 completed")
+
+    def test_counts_are_invalidated_on_task_writes(self):
+        self.view.get_tasks_status_description()
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title="Task", description="", priority=5, completed=True, user=self.user)
+        self.assertEqual(self.view.get_tasks_status_description(), "2 of 4 completed")
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        self.assertEqual(self.view.get_tasks_status_description(), "1 of 3 completed")
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(user=self.user).update(completed=True)
+        self.assertEqual(self.view.get_tasks_status_description(), "3 of 3 completed")
+
+    def test_counts_are_invalidated_once_the_write_commits(self):
+        self.view.get_tasks_status_description()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Task.objects.filter(user=self.user).update(completed=True)
+            # Other connections only see the update once it commits, so the old version stays in use until then.
+            self.assertEqual(self.view.get_tasks_status_description(), "1 of 3 completed")
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.view.get_tasks_status_description(), "3 of 3 completed")
+
+
+class TaskKeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        for priority in range(1, 6):
+            for completed in [False, True]:
+                Task.objects.create(
+                    title=f"Task {priority} {completed}",
+                    description="",
+                    priority=priority,
+                    completed=completed,
+                    user=self.user,
+                )
+        self.client.login(username="tester", password="password")
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            pages.append([task.title for task in response.context["tasks"]])
+            url = getattr(response.context["page_obj"], f"{link}_url")
+            url = url and f"/tasks/{url}"
+        return pages
+
+    def test_pages_follow_listing_order(self):
+        pages = self.walk("/tasks/?page_size=3", "next")
+        titles = [title for page in pages for title in page]
+        expected = list(
+            Task.objects.filter(user=self.user).order_by("completed", "priority", "id").values_list("title", flat=True)
+        )
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+        self.assertEqual(titles, expected)
+
+    def test_previous_pages_mirror_next_pages(self):
+        next_pages = self.walk("/tasks/?page_size=4", "next")
+        cache.clear()  # Render the first page again rather than serving it from the cache.
+        response = self.client.get("/tasks/?page_size=4")
+        while response.context["page_obj"].has_next():
+            response = self.client.get(f"/tasks/{response.context['page_obj'].next_url}")
+        previous_pages = self.walk(f"/tasks/{response.context['page_obj'].previous_url}", "previous")
+        self.assertEqual(previous_pages, next_pages[-2::-1])
+
+    def test_page_size_is_clamped(self):
+        response = self.client.get("/tasks/pending/?page_size=0")
+        self.assertEqual(len(response.context["tasks"]), 1)
+        response = self.client.get("/tasks/pending/?page_size=1000")
+        self.assertEqual(len(response.context["tasks"]), 5)
+        self.assertFalse(response.context["is_paginated"])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get("/tasks/completed/?after=1.x.3").status_code, 404)
+        self.assertEqual(self.client.get("/tasks/completed/?after=1.2").status_code, 404)
+
+
+class TaskApiPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        for priority in range(1, 6):
+            for completed in [False, True]:
+                Task.objects.create(
+                    title=f"Task {priority} {completed}",
+                    description="",
+                    priority=priority,
+                    completed=completed,
+                    user=self.user,
+                )
+        self.client.login(username="tester", password="password")
+
+    def test_cursor_pages_follow_listing_order(self):
+        ids, url = [], "/api/v1/tasks/?page_size=3"
+        while url:
+            response = self.client.get(url).json()
+            ids.extend(task["id"] for task in response["results"])
+            url = response["next"]
+        self.assertEqual(
+            ids,
+            list(
+                Task.objects.filter(user=self.user)
+                .order_by(*TaskCursorPagination.ordering)
+                .values_list("id", flat=True)
+            ),
+        )
+        previous = self.client.get(response["previous"]).json()
+        self.assertEqual([task["id"] for task in previous["results"]], ids[-4:-1])
+        self.assertIsNotNone(previous["next"])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get("/api/v1/tasks/?cursor=bm9wZQ").status_code, 404)
+
+    def test_sparse_fieldset_loads_only_requested_columns(self):
+        with self.assertNumQueries(3):  # The session, the user and the page.
+            response = self.client.get("/api/v1/tasks/?fields=id,title&page_size=2")
+        self.assertEqual(
+            response.json()["results"],
+            list(
+                Task.objects.filter(user=self.user).order_by(*TaskCursorPagination.ordering).values("id", "title")[:2]
+            ),
+        )
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/tasks/?fields=title,user")
+        self.assertEqual(response.json()["results"][0]["user"]["username"], "tester")
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get("/api/v1/tasks/?fields=id,secret")
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskStatusChangesApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        self.client.login(username="tester", password="password")
+
+    def log_changes(self, count):
+        tasks = Task.objects.bulk_create(
+            Task(title=f"Task {priority}", description="", priority=priority, user=self.user)
+            for priority in range(count)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(id__in=[task.id for task in tasks]).update(status=Task.Statuses.IN_PROGRESS)
+
+    def test_query_count_does_not_grow_with_the_log(self):
+        self.log_changes(1)
+        with self.assertNumQueries(3):  # The session, the user and the page.
+            self.assertEqual(len(self.client.get("/api/v1/task-status-changes/").json()["results"]), 1)
+        self.log_changes(20)
+        with self.assertNumQueries(3):
+            results = self.client.get("/api/v1/task-status-changes/").json()["results"]
+        self.assertEqual(len(results), 21)
+        self.assertEqual(set(results[0]["task"]), {"id", "title", "description"})
+
+    def test_log_is_paginated(self):
+        self.log_changes(5)
+        response = self.client.get("/api/v1/task-status-changes/?page_size=3").json()
+        self.assertEqual(len(response["results"]), 3)
+        response = self.client.get(response["next"]).json()
+        self.assertEqual(len(response["results"]), 2)
+        self.assertIsNone(response["next"])
+
+    def test_archived_logs_are_listed_on_request(self):
+        self.log_changes(5)
+        old_logs = list(TaskStatusChangeLog.objects.order_by("id").values_list("id", flat=True)[:3])
+        TaskStatusChangeLog.objects.filter(id__in=old_logs).update(timestamp=timezone.now() - timedelta(days=100))
+        self.assertEqual(len(self.client.get("/api/v1/task-status-changes/").json()["results"]), 5)
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("archive_status_changes", "--chunk-size", "2", stdout=out)
+        self.assertIn("Archived 3 status change logs", out.getvalue())
+        self.assertEqual(set(ArchivedTaskStatusChangeLog.objects.values_list("id", flat=True)), set(old_logs))
+        self.assertEqual(len(self.client.get("/api/v1/task-status-changes/").json()["results"]), 2)
+        response = self.client.get("/api/v1/task-status-changes/?include_archived=1&page_size=3").json()
+        self.assertEqual(len(response["results"]), 3)
+        response = self.client.get(response["next"]).json()
+        self.assertEqual(len(response["results"]), 2)
+        self.assertIsNone(response["next"])
+
+    def test_archive_deletes_do_not_grow_with_the_chunk(self):
+        self.log_changes(5)
+        TaskStatusChangeLog.objects.update(timestamp=timezone.now() - timedelta(days=100))
+        with CaptureQueriesContext(connection) as queries:
+            call_command("archive_status_changes", "--chunk-size", "2000", stdout=StringIO())
+        deletes = [query["sql"] for query in queries if query["sql"].startswith("DELETE")]
+        self.assertTrue(deletes)
+        self.assertFalse([sql for sql in deletes if " IN (" in sql])
+        self.assertEqual(ArchivedTaskStatusChangeLog.objects.count(), 5)
+        self.assertFalse(TaskStatusChangeLog.objects.exists())
+
+    def test_archived_logs_of_deleted_tasks_are_purged(self):
+        self.log_changes(2)
+        TaskStatusChangeLog.objects.update(timestamp=timezone.now() - timedelta(days=100))
+        call_command("archive_status_changes", stdout=StringIO())
+        Task.objects.first().delete()
+        self.assertEqual(ArchivedTaskStatusChangeLog.objects.count(), 2)
+        out = StringIO()
+        call_command("archive_status_changes", stdout=out)
+        self.assertIn("purged 1 logs of deleted tasks", out.getvalue())
+        self.assertEqual(ArchivedTaskStatusChangeLog.objects.count(), 1)
+
+
+class TaskBulkApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        for priority in [1, 2, 3, 5]:
+            Task.objects.create(title=f"Task {priority}", description="", priority=priority, user=self.user)
+        Task.objects.create(title="Done", description="", priority=2, completed=True, user=self.user)
+        self.tasks = Task.objects.filter(user=self.user, deleted=False)
+        self.client.login(username="tester", password="password")
+
+    def bulk(self, method, data):
+        return getattr(self.client, method)("/api/v1/tasks/bulk/", data, content_type="application/json")
+
+    def pending_titles(self):
+        return list(self.tasks.filter(completed=False).values_list("priority", "title"))
+
+    def test_create_cascades_like_one_at_a_time(self):
+        new_tasks = [{"title": f"New {index}", "description": "New", "priority": 2} for index in range(2)]
+        new_tasks.append({"title": "New done", "description": "New", "priority": 1, "completed": True})
+        # The session, the user, a savepoint, the lock, the pending tasks, the shift in its own savepoint with the users
+        # of the shifted tasks, the INSERT, two search index writes, counting the new tasks, the task stats UPDATE and
+        # the savepoint release.
+        with self.assertNumQueries(15):
+            response = self.bulk("post", new_tasks)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([task["priority"] for task in response.json()], [3, 2, 1])
+        self.assertEqual(
+            self.pending_titles(),
+            [(1, "Task 1"), (2, "New 1"), (3, "New 0"), (4, "Task 2"), (5, "Task 3"), (6, "Task 5")],
+        )
+
+    def test_update_moves_tasks_and_logs_status_changes(self):
+        ids = dict(self.tasks.filter(completed=False).values_list("title", "id"))
+        response = self.bulk(
+            "patch",
+            [
+                {"id": ids["Task 5"], "priority": 1},
+                {"id": ids["Task 1"], "status": Task.Statuses.IN_PROGRESS},
+                {"id": ids["Task 3"], "completed": True},
+            ],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.pending_titles(), [(1, "Task 5"), (2, "Task 1"), (3, "Task 2")])
+        self.assertEqual(
+            list(TaskStatusChangeLog.objects.values_list("task_id", "new_status")),
+            [(ids["Task 1"], Task.Statuses.IN_PROGRESS)],
+        )
+
+    def test_update_query_count_does_not_grow_with_the_batch(self):
+        ids = list(self.tasks.values_list("id", flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk("patch", [{"id": ids[0], "description": "Updated"}])
+        with self.assertNumQueries(len(queries)):
+            response = self.bulk("patch", [{"id": task_id, "description": "Updated again"} for task_id in ids])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({task["user"]["username"] for task in response.json()}, {"tester"})
+
+    def test_unknown_task_fails_the_whole_batch(self):
+        task = self.tasks.get(priority=1)
+        response = self.bulk("patch", [{"id": task.id, "priority": 7}, {"id": 0, "priority": 8}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [{}, {"id": ["No such task."]}])
+        self.assertEqual(self.tasks.get(id=task.id).priority, 1)
+        self.assertEqual(self.bulk("delete", [task.id, 0]).status_code, 400)
+        self.assertTrue(self.tasks.filter(id=task.id).exists())
+
+    def test_delete(self):
+        ids = list(self.tasks.filter(completed=False).values_list("id", flat=True)[:2])
+        self.assertEqual(self.bulk("delete", ids).status_code, 204)
+        self.assertEqual(self.pending_titles(), [(3, "Task 3"), (5, "Task 5")])
+
+
+class TaskSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        self.milk = Task.objects.create(title="Milk", description="Buy milk, and more milk", priority=1, user=self.user)
+        self.groceries = Task.objects.create(
+            title="Groceries", description="Eggs, bread, milk, butter, cheese and apples", priority=2, user=self.user
+        )
+        self.report = Task.objects.create(
+            title="Report", description="Write the quarterly report", priority=3, user=self.user
+        )
+        self.tasks = Task.objects.filter(user=self.user, deleted=False)
+        self.client.login(username="tester", password="password")
+
+    def search(self, query, backend=None):
+        tasks = self.tasks.search(query) if backend is None else backend.search(self.tasks, query)
+        return list(tasks.order_by("search_rank").values_list("title", flat=True))
+
+    def test_matches_every_word_by_prefix_ranked_by_relevance(self):
+        self.assertEqual(self.search("milk"), ["Milk", "Groceries"])
+        self.assertEqual(self.search("BUTT mil"), ["Groceries"])
+        self.assertEqual(self.search('quarter "OR" report*'), [])
+        self.assertEqual(self.search("quarter report"), ["Report"])
+        self.assertEqual(self.tasks.search("--").count(), 3)
+
+    def test_index_follows_writes(self):
+        self.report.description = "Milk the budget"
+        self.report.save()
+        self.groceries.delete()
+        self.assertEqual(set(self.search("milk")), {"Milk", "Report"})
+        self.tasks.filter(id=self.milk.id).update(title="Tea", description="Green")
+        self.assertEqual(self.search("milk"), ["Report"])
+        self.assertEqual(self.search("green"), ["Tea"])
+
+    def test_uses_fts5_where_available(self):
+        if not FTS5SearchBackend.is_available():
+            self.skipTest("The database has no FTS5 table.")
+        self.assertIsInstance(get_search_backend(), FTS5SearchBackend)
+
+    def test_backends_agree(self):
+        backend = InvertedIndexSearchBackend()
+        for query in ["milk", "BUTT mil", "report", "nothing"]:
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query, backend), self.search(query))
+
+    def test_inverted_index_follows_writes(self):
+        backend = InvertedIndexSearchBackend()
+        self.search("milk", backend)
+        self.report.description = "Milk the budget"
+        backend.index([self.report])
+        backend.remove(self.groceries.id)
+        self.assertEqual(set(self.search("milk", backend)), {"Milk", "Report"})
+        self.assertEqual(self.search("quarterly", backend), [])
+
+    def test_inverted_index_only_ranks_the_searched_tasks(self):
+        backend = InvertedIndexSearchBackend()
+        other = User.objects.create_user("other")
+        Task.objects.bulk_create(
+            Task(title="Milk", description="", priority=priority, user=other) for priority in range(20)
+        )
+        backend.index(Task.objects.filter(user=other))
+        self.assertEqual(set(backend.rank("milk", {self.milk.id})), {self.milk.id})
+        self.assertEqual(self.search("milk", backend), ["Milk", "Groceries"])
+        self.assertEqual(str(backend.search(self.tasks, "milk").query).count("WHEN"), 2)
+
+    def test_html_views_page_through_ranked_results(self):
+        for index in range(3):
+            Task.objects.create(title=f"Milk {index}", description="milk " * index, priority=4 + index, user=self.user)
+        titles, url = [], "/tasks/?search=milk&page_size=2"
+        while url:
+            response = self.client.get(url)
+            titles.extend(task.title for task in response.context["tasks"])
+            url = response.context["page_obj"].next_url
+            url = url and f"/tasks/{url}"
+        self.assertEqual(titles, self.search("milk"))
+        self.assertEqual(self.client.get("/tasks/completed/?search=milk").context["tasks"], [])
+
+    def test_api_search_is_ranked(self):
+        response = self.client.get("/api/v1/tasks/?search=milk&fields=title").json()
+        self.assertEqual(response["results"], [{"title": "Milk"}, {"title": "Groceries"}])
+
+
+class TaskListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        self.task = Task.objects.create(title="Task", description="", priority=1, user=self.user)
+        self.client.login(username="tester", password="password")
+
+    def test_task_list_fragment_is_cached_until_a_task_is_written(self):
+        hits = caching.get_stats().get(("fragment", "hit"), 0)
+        self.client.get("/tasks/")
+        with self.assertNumQueries(2):  # The session and the user.
+            response = self.client.get("/tasks/")
+        self.assertContains(response, "Task")
+        self.task.title = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.save()
+        self.assertContains(self.client.get("/tasks/"), "Renamed")
+        self.assertEqual(caching.get_stats()[("fragment", "hit")], hits + 1)
+
+    def test_api_list_is_cached_until_a_task_is_written(self):
+        self.client.get("/api/v1/tasks/")
+        with self.assertNumQueries(2):
+            self.client.get("/api/v1/tasks/")
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(id=self.task.id).update(priority=2)
+        self.assertEqual(self.client.get("/api/v1/tasks/").json()["results"][0]["priority"], 2)
+
+    def test_cache_is_per_user(self):
+        self.client.get("/api/v1/tasks/")
+        User.objects.create_user("other", password="password")
+        self.client.login(username="other", password="password")
+        self.assertEqual(self.client.get("/api/v1/tasks/").json()["results"], [])
+
+    def test_metrics_expose_hits_and_misses(self):
+        self.client.get("/tasks/")
+        self.client.get("/tasks/")
+        metrics = self.client.get("/metrics/").content.decode()
+        self.assertIn('task_cache_lookups_total{kind="fragment",result="miss"}', metrics)
+        self.assertIn('task_cache_lookups_total{kind="fragment",result="hit"}', metrics)
+
+
+class UserTaskStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        self.other = User.objects.create_user("other", password="password")
+        self.tasks = [
+            Task.objects.create(title=f"Task {priority}", description="", priority=priority, user=self.user)
+            for priority in range(4)
+        ]
+
+    def assertStatsAreCounted(self):
+        for user in [self.user, self.other]:
+            stats = UserTaskStats.get_for_user(user.id)
+            counts = UserTaskStats.count_tasks(Task.objects.filter(user=user)).get(user.id, {})
+            self.assertEqual(
+                {field: getattr(stats, field) for field in UserTaskStats.count_fields},
+                {field: counts.get(field, 0) for field in UserTaskStats.count_fields},
+            )
+
+    def test_stats_follow_every_kind_of_write(self):
+        self.assertEqual(UserTaskStats.get_for_user(self.user.id).pending_status, 4)
+        self.tasks[0].status = Task.Statuses.IN_PROGRESS
+        self.tasks[0].completed = True
+        self.tasks[0].save()
+        self.tasks[1].deleted = True
+        self.tasks[1].save(update_fields=["deleted"])
+        self.tasks[2].delete()
+        Task.objects.filter(id=self.tasks[3].id).update(user=self.other, status=Task.Statuses.CANCELLED)
+        Task(id=self.tasks[0].id, title="Task", description="", priority=0, user=self.user).save()
+        self.assertStatsAreCounted()
+        stats = UserTaskStats.get_for_user(self.user.id)
+        self.assertEqual((stats.total, stats.pending, stats.completed, stats.deleted), (1, 1, 0, 1))
+        self.assertEqual(UserTaskStats.get_for_user(self.other.id).cancelled_status, 1)
+
+    def test_stats_endpoint_is_a_single_lookup(self):
+        self.client.login(username="tester", password="password")
+        UserTaskStats.get_for_user(self.user.id)
+        with self.assertNumQueries(3):  # The session, the user and the stats.
+            response = self.client.get("/api/v1/stats/")
+        self.assertEqual(
+            response.json(),
+            {
+                "total": 4,
+                "pending": 4,
+                "completed": 0,
+                "deleted": 0,
+                "pending_status": 4,
+                "in_progress_status": 0,
+                "completed_status": 0,
+                "cancelled_status": 0,
+            },
+        )
+
+    def test_updates_moving_tasks_out_of_their_queryset(self):
+        UserTaskStats.get_for_user(self.user.id)
+        pending = Task.objects.filter(user=self.user, completed=False)
+        with CaptureQueriesContext(connection) as queries:
+            pending.filter(priority__lt=2).update(completed=True, title="Done")
+        # Read with the queryset's own filter, rather than with a list of the ids of the tasks.
+        self.assertFalse([query for query in queries if " IN (" in query["sql"]])
+        pending.filter(priority=2).update(status=Task.Statuses.CANCELLED, user=self.other)
+        self.tasks[3].deleted = True
+        Task.objects.bulk_update([self.tasks[3]], ["deleted"])
+        self.assertStatsAreCounted()
+        self.assertEqual(set(Task.objects.search("done").values_list("priority", flat=True)), {0, 1})
+        self.assertEqual(TaskStatusChangeLog.objects.get().new_status, Task.Statuses.CANCELLED)
+
+    def test_deleting_a_user_drops_their_stats(self):
+        UserTaskStats.get_for_user(self.user.id)
+        UserTaskStats.get_for_user(self.other.id)
+        user_id = self.user.id
+        Task.objects.filter(id=self.tasks[0].id).update(completed=True)
+        self.user.delete()
+        self.assertFalse(UserTaskStats.objects.filter(user_id=user_id).exists())
+        self.assertEqual(list(UserTaskStats.objects.values_list("user", flat=True)), [self.other.id])
+
+    def test_updates_commit_together_with_their_stats(self):
+        with mock.patch.object(UserTaskStats, "record_changes", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Task.objects.filter(user=self.user).update(completed=True)
+        self.assertFalse(Task.objects.filter(completed=True).exists())
+        self.assertStatsAreCounted()
+
+    def test_removals_leave_missing_stats_to_be_counted_on_demand(self):
+        UserTaskStats.objects.filter(user=self.user).delete()
+        self.tasks[0].delete()
+        self.assertFalse(UserTaskStats.objects.filter(user=self.user).exists())
+        self.assertStatsAreCounted()
+
+    def test_reconcile_command_fixes_drift(self):
+        UserTaskStats.get_for_user(self.user.id)
+        UserTaskStats.objects.filter(user=self.user).update(total=10)
+        out = StringIO()
+        call_command("reconcile_task_stats", "--dry-run", stdout=out)
+        self.assertIn(f"User {self.user.id}: total 10 -> 4", out.getvalue())
+        self.assertEqual(UserTaskStats.get_for_user(self.user.id).total, 10)
+        call_command("reconcile_task_stats", stdout=out)
+        self.assertStatsAreCounted()
+
+
+class TaskStatusRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        self.task = Task.objects.create(title="Task", description="", priority=1, user=self.user)
+
+    def change_status(self, status, at):
+        with mock.patch("django.utils.timezone.now", return_value=at):
+            self.task.status = status
+            self.task.save()
+
+    def change_statuses(self):
+        # Monday 09:10, then half an hour later through `update`, then the next day.
+        self.change_status(Task.Statuses.IN_PROGRESS, datetime(2026, 10, 12, 9, 10, tzinfo=dt_timezone.utc))
+        with mock.patch(
+            "django.utils.timezone.now", return_value=datetime(2026, 10, 12, 9, 40, tzinfo=dt_timezone.utc)
+        ):
+            Task.objects.filter(id=self.task.id).update(status=Task.Statuses.COMPLETED)
+        self.task.refresh_from_db()
+        self.change_status(Task.Statuses.PENDING, datetime(2026, 10, 13, 12, 0, tzinfo=dt_timezone.utc))
+
+    def get_rollups(self):
+        return sorted(
+            TaskStatusRollup.objects.values_list(
+                "user",
+                "period",
+                "bucket",
+                "old_status",
+                "new_status",
+                "transitions",
+                "time_in_status",
+                "timed_transitions",
+            )
+        )
+
+    def test_rollups_follow_status_changes(self):
+        self.change_statuses()
+        monday = datetime(2026, 10, 12, tzinfo=dt_timezone.utc)
+        days = TaskStatusRollup.objects.filter(period="day").order_by("bucket", "old_status")
+        self.assertEqual(
+            [(rollup.bucket, rollup.old_status, rollup.transitions, rollup.time_in_status) for rollup in days],
+            [
+                (monday, Task.Statuses.IN_PROGRESS, 1, 1800),
+                (monday, Task.Statuses.PENDING, 1, 0),
+                (datetime(2026, 10, 13, tzinfo=dt_timezone.utc), Task.Statuses.COMPLETED, 1, 26 * 3600 + 20 * 60),
+            ],
+        )
+        weeks = TaskStatusRollup.objects.filter(period="week")
+        self.assertEqual({rollup.bucket for rollup in weeks}, {monday})
+        self.assertEqual(sum(rollup.timed_transitions for rollup in weeks), 2)
+        self.assertEqual(TaskStatusRollup.objects.filter(period="hour").count(), 3)
+
+    def test_previous_statuses_are_looked_up_in_batches(self):
+        Task.objects.create(title="Task", description="", priority=2, user=self.user)
+        tasks = Task.objects.filter(user=self.user)
+        tasks.update(status=Task.Statuses.IN_PROGRESS)
+        with mock.patch.object(TaskStatusRollup, "lookup_batch_size", 1), CaptureQueriesContext(connection) as queries:
+            tasks.update(status=Task.Statuses.COMPLETED)
+        self.assertEqual(len([query for query in queries if "MAX(" in query["sql"]]), 2)
+        timed = TaskStatusRollup.objects.filter(period="hour", old_status=Task.Statuses.IN_PROGRESS)
+        self.assertEqual(timed.get().timed_transitions, 2)
+
+    def test_backfill_rebuilds_the_same_rollups(self):
+        self.change_statuses()
+        rollups = self.get_rollups()
+        TaskStatusRollup.objects.filter(period="hour").delete()
+        TaskStatusRollup.objects.update(transitions=10)
+        out = StringIO()
+        call_command("backfill_status_rollups", stdout=out)
+        self.assertEqual(self.get_rollups(), rollups)
+        self.assertIn("Rebuilt 9 task status rollups.", out.getvalue())
+
+    def test_analytics_endpoint(self):
+        self.change_statuses()
+        self.client.login(username="tester", password="password")
+        response = self.client.get("/api/v1/task-status-analytics/", {"period": "week", "new_status": "Completed"})
+        self.assertEqual(
+            response.json(),
+            {
+                "period": "week",
+                "transitions": [
+                    {
+                        "bucket": "2026-10-12T00:00:00Z",
+                        "old_status": "In Progress",
+                        "new_status": "Completed",
+                        "transitions": 1,
+                    }
+                ],
+                "mean_time_in_status": {"In Progress": 1800.0},
+            },
+        )
+        response = self.client.get("/api/v1/task-status-analytics/", {"bucket_after": "2026-10-13T00:00:00Z"})
+        self.assertEqual([row["old_status"] for row in response.json()["transitions"]], ["Completed"])
+        self.assertEqual(self.client.get("/api/v1/task-status-analytics/", {"period": "month"}).status_code, 400)
+
+
+class TaskAsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        self.other = User.objects.create_user("other", password="password")
+        self.tasks = Task.objects.bulk_create(
+            Task(title=f"Task {priority}", description="", priority=priority, user=self.user) for priority in range(5)
+        )
+        Task.objects.filter(user=self.user).update(status=Task.Statuses.IN_PROGRESS)
+        self.async_client.force_login(self.user)
+        self.client.force_login(self.user)
+
+    async def test_task_list_pages_like_the_api(self):
+        response = await self.async_client.get("/api/v1/async/tasks/", {"page_size": 3})
+        page = response.json()
+        response = await self.async_client.get(page["next"])
+        self.assertIsNone(response.json()["next"])
+        results = page["results"] + response.json()["results"]
+        api_results = (await sync_to_async(self.client.get)("/api/v1/tasks/")).json()["results"]
+        self.assertEqual(results, api_results)
+
+    async def test_task_detail_is_limited_to_own_tasks(self):
+        response = await self.async_client.get(f"/api/v1/async/tasks/{self.tasks[0].id}/")
+        self.assertEqual(response.json()["title"], "Task 0")
+        await sync_to_async(self.async_client.force_login)(self.other)
+        response = await self.async_client.get(f"/api/v1/async/tasks/{self.tasks[0].id}/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_status_changes_include_archived_on_request(self):
+        await sync_to_async(ArchivedTaskStatusChangeLog.objects.create)(
+            id=1000,
+            task=self.tasks[0],
+            timestamp=timezone.now() - timedelta(days=100),
+            old_status="Completed",
+            new_status="Pending",
+        )
+        response = await self.async_client.get("/api/v1/async/task-status-changes/", {"page_size": 3})
+        page = response.json()
+        self.assertEqual(len(page["results"]), 3)
+        self.assertEqual(len((await self.async_client.get(page["next"])).json()["results"]), 2)
+        response = await self.async_client.get("/api/v1/async/task-status-changes/", {"include_archived": 1})
+        self.assertEqual(len(response.json()["results"]), 6)
+        self.assertEqual(response.json()["results"][-1]["old_status"], "Completed")
+
+    async def test_anonymous_requests_are_turned_away(self):
+        await sync_to_async(self.async_client.logout)()
+        response = await self.async_client.get("/api/v1/async/tasks/")
+        self.assertEqual(response.status_code, 403)
+
+
+class TaskEventsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        self.other = User.objects.create_user("other", password="password")
+        self.task = Task.objects.create(title="Task", description="", priority=1, user=self.user)
+        self.client.login(username="tester", password="password")
+
+    def connect(self, **headers):
+        response = self.client.get("/api/v1/events/", HTTP_ACCEPT="text/event-stream", **headers)
+        self.addCleanup(response.close)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.stream = iter(response.streaming_content)
+        self.assertEqual(next(self.stream), b"retry: 3000\n\n")
+        return response
+
+    def read(self):
+        fields = dict(line.split(": ", 1) for line in next(self.stream).decode().strip().split("\n"))
+        return fields["event"], fields.get("id"), json.loads(fields["data"])
+
+    def test_task_changes_are_streamed(self):
+        self.connect()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.status = Task.Statuses.IN_PROGRESS
+            self.task.save()
+        log = TaskStatusChangeLog.objects.get()
+        self.assertEqual(self.read()[:2], ("status", str(log.id)))
+        event, _, data = self.read()
+        self.assertEqual((event, data["created"], data["task"]["status"]), ("task", False, "In Progress"))
+        task_id = self.task.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.delete()
+        self.assertEqual(self.read(), ("delete", None, {"id": task_id}))
+
+    def test_other_users_changes_are_not_streamed(self):
+        with mock.patch.object(TaskEventsView, "heartbeat", 0.01):
+            self.connect()
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.create(title="Other", description="", priority=1, user=self.other)
+            self.assertEqual(next(self.stream), b": heartbeat\n\n")
+
+    def test_reconnecting_replays_missed_status_changes(self):
+        for status in [Task.Statuses.IN_PROGRESS, Task.Statuses.COMPLETED, Task.Statuses.CANCELLED]:
+            Task.objects.filter(id=self.task.id).update(status=status)
+        first, *missed = TaskStatusChangeLog.objects.order_by("id")
+        self.connect(HTTP_LAST_EVENT_ID=str(first.id))
+        self.assertEqual([self.read()[1] for _ in missed], [str(log.id) for log in missed])
+        self.assertEqual(self.read()[0], "refresh")
+
+    def test_closing_the_stream_unsubscribes(self):
+        response = self.connect()
+        self.assertIn(self.user.id, events.bus.subscriptions)
+        response.close()
+        self.assertNotIn(self.user.id, events.bus.subscriptions)
+
+    def test_anonymous_requests_are_turned_away(self):
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/v1/events/").status_code, 403)
+
+
+class TaskEventsAsgiTests(TransactionTestCase):
+    """Drives the ASGI application, whose Django handler reads the database from threads of its own."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("tester", password="password")
+        self.task = Task.objects.create(title="Task", description="", priority=1, user=self.user)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def connect(self, path, authenticated=True):
+        headers = [(b"host", b"testserver")]
+        if authenticated:
+            session = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+            headers.append((b"cookie", f"{settings.SESSION_COOKIE_NAME}={session}".encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        return ApplicationCommunicator(application, scope)
+
+    def change_status(self):
+        self.task.status = Task.Statuses.IN_PROGRESS
+        self.task.save()
+
+    async def test_stream_leaves_the_event_loop_free(self):
+        stream = self.connect("/api/v1/events/")
+        await stream.send_input({"type": "http.request"})
+        response = await stream.receive_output(1)
+        self.assertEqual(response["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), response["headers"])
+        self.assertEqual((await stream.receive_output(1))["body"], b"retry: 3000\n\n")
+        # Served by Django's handler while the stream waits for events.
+        other = self.connect("/api/v1/async/tasks/")
+        await other.send_input({"type": "http.request"})
+        self.assertEqual((await other.receive_output(1))["status"], 200)
+        await sync_to_async(self.change_status)()
+        self.assertTrue((await stream.receive_output(1))["body"].startswith(b"event: status\n"))
+        self.assertTrue((await stream.receive_output(1))["body"].startswith(b"event: task\n"))
+        await stream.send_input({"type": "http.disconnect"})
+        await stream.wait(1)
+        self.assertNotIn(self.user.id, events.bus.subscriptions)
+
+    async def test_heartbeats(self):
+        with mock.patch.object(TaskEventsView, "heartbeat", 0.01):
+            stream = self.connect("/api/v1/events/")
+            await stream.send_input({"type": "http.request"})
+            await stream.receive_output(1)
+            await stream.receive_output(1)
+            self.assertEqual((await stream.receive_output(1))["body"], b": heartbeat\n\n")
+            await stream.send_input({"type": "http.disconnect"})
+            await stream.wait(1)
+
+    async def test_anonymous_requests_are_turned_away(self):
+        stream = self.connect("/api/v1/events/", authenticated=False)
+        await stream.send_input({"type": "http.request"})
+        self.assertEqual((await stream.receive_output(1))["status"], 403)
+
+    async def test_blocking_view_is_refused_by_django_asgi_handler(self):
+        response = await self.async_client.get("/api/v1/events/")
+        self.assertEqual(response.status_code, 501)
+
+
+@skipUnless(connection.vendor == "sqlite", "Asserts on SQLite query plans.")
+class TaskQueryPlanTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tester", password="password")
+        self.request = RequestFactory().get("/")
+        self.request.user = self.user
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f"USING INDEX {index_name}", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_task_views_use_listing_index(self):
+        for view_class in [AllTaskView, PendingTaskView, CompletedTaskView]:
+            view = view_class()
+            view.setup(self.request)
+            with self.subTest(view=view_class.__name__):
+                self.assertUsesIndex(view.get_queryset(), "task_user_listing_idx")
+
+    def test_task_view_pages_seek_through_listing_index(self):
+        view = AllTaskView()
+        view.setup(self.request)
+        queryset = Task.objects.filter(user=self.user, deleted=False).seek(view.keyset_ordering, [0, 3, 7], "gt")
+        self.assertUsesIndex(queryset.order_by(*view.keyset_ordering), "task_user_listing_idx")
+
+    def test_task_api_uses_listing_index(self):
+        request = Request(self.request)
+        request.user = self.user
+        queryset = TaskViewSet(request=request, action="list").get_queryset()
+        ordering = TaskCursorPagination.ordering
+        self.assertUsesIndex(queryset.order_by(*ordering), "task_user_listing_idx")
+        self.assertUsesIndex(queryset.seek(ordering, [0, 3, 7], "gt").order_by(*ordering), "task_user_listing_idx")
+
+    def test_cascade_uses_pending_priority_index(self):
+        tasks = Task.objects.filter(user=self.user, deleted=False, completed=False)
+        self.assertUsesIndex(tasks.filter(priority__gte=3).order_by("priority"), "task_pending_priority_idx")
+
+    def test_status_change_log_uses_timestamp_index(self):
+        task = Task.objects.create(title="Task", description="", priority=1, user=self.user)
+        self.assertUsesIndex(
+            TaskStatusChangeLog.objects.filter(task=task).order_by("timestamp"), "task_status_log_timestamp_idx"
+        )
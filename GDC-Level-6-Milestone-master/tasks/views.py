@@ -1,11 +1,18 @@
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView
+from django.db import transaction
 from django.forms import ModelForm, ValidationError
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from django.views.generic import View
+from django.views.generic.base import ContextMixin
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
+from tasks import caching, events
 from tasks.models import Task
 
 
@@ -67,20 +74,115 @@ class UserSignupView(UserAuthenticationViewMixin, CreateView):
     success_url = "/user/login"
 
 
-class GenericTaskView(AuthorizedTaskManager, ListView):
+class KeysetPage:
+    """A page of a keyset paginated list, linking to its neighbours by cursor rather than by page number."""
+
+    def __init__(self, object_list, previous_url=None, next_url=None):
+        self.object_list = object_list
+        self.previous_url = previous_url
+        self.next_url = next_url
+
+    def has_previous(self):
+        return self.previous_url is not None
+
+    def has_next(self):
+        return self.next_url is not None
+
+
+class KeysetPaginationMixin:
+    """
+    Paginates a list view by seeking past the `keyset_ordering` values of the last (or first) task on the
+    current page, so that deep pages are as cheap as the first one unlike OFFSET based pagination.
+    """
+
+    keyset_ordering = ("completed", "priority", "id")
+    paginate_by = 10
+    max_paginate_by = 50
+
+    def get_paginate_by(self, queryset):
+        try:
+            page_size = int(self.request.GET.get("page_size", self.paginate_by))
+        except ValueError:
+            page_size = self.paginate_by
+        return max(1, min(page_size, self.max_paginate_by))
+
+    def get_keyset_ordering(self, queryset):
+        """Orders search results by relevance, and everything else like the listings."""
+        if "search_rank" in queryset.query.annotations:
+            return ("search_rank", "id")
+        return self.keyset_ordering
+
+    def get_cursor(self, task, ordering) -> str:
+        values = [getattr(task, field) for field in ordering]
+        return ",".join(repr(value) if isinstance(value, float) else str(int(value)) for value in values)
+
+    def parse_cursor(self, cursor, ordering) -> list:
+        try:
+            values = [int(value) if value.lstrip("-").isdigit() else float(value) for value in cursor.split(",")]
+        except ValueError:
+            raise Http404("Invalid page cursor.")
+        if len(values) != len(ordering):
+            raise Http404("Invalid page cursor.")
+        return values
+
+    def get_page_url(self, **params):
+        search = self.request.GET.get("search")
+        if search:
+            params["search"] = search
+        return f"?{urlencode({**params, 'page_size': self.get_paginate_by(None)})}"
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get("after")
+        before = self.request.GET.get("before")
+        ordering = self.get_keyset_ordering(queryset)
+        if before:
+            queryset = queryset.seek(ordering, self.parse_cursor(before, ordering), "lt")
+            tasks = list(queryset.order_by(*[f"-{field}" for field in ordering])[: page_size + 1])
+            has_previous, has_next = len(tasks) > page_size, True
+            tasks = tasks[:page_size][::-1]
+        else:
+            if after:
+                queryset = queryset.seek(ordering, self.parse_cursor(after, ordering), "gt")
+            tasks = list(queryset.order_by(*ordering)[: page_size + 1])
+            has_previous, has_next = bool(after), len(tasks) > page_size
+            tasks = tasks[:page_size]
+        page = KeysetPage(
+            tasks,
+            previous_url=(
+                self.get_page_url(before=self.get_cursor(tasks[0], ordering)) if has_previous and tasks else None
+            ),
+            next_url=self.get_page_url(after=self.get_cursor(tasks[-1], ordering)) if has_next and tasks else None,
+        )
+        return (None, page, tasks, page.has_previous() or page.has_next())
+
+
+class GenericTaskView(AuthorizedTaskManager, KeysetPaginationMixin, ListView):
     model = Task
     template_name = "tasks.html"
     context_object_name = "tasks"
 
+    def get_queryset(self):
+        tasks = super().get_queryset()
+        search = self.request.GET.get("search")
+        return tasks.search(search) if search else tasks
+
     def get_tasks_status_description(self):
-        all = super().get_queryset()
-        completed = all.filter(completed=True)
-        return f"{len(completed)} of {len(all)} completed"
+        counts = Task.get_status_counts(self.request.user)
+        return f"{counts['completed']} of {counts['total']} completed"
+
+    def render_task_list(self) -> str:
+        """Renders the page of tasks and its navigation, the only part of the page that lists tasks."""
+        return render_to_string("task_list.html", super().get_context_data(), self.request)
 
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+        # The task list is paginated and rendered apart from the rest of the page, so that it can be cached.
+        context = ContextMixin.get_context_data(self, **kwargs)
+        context["task_list"] = caching.get_or_set(
+            self.request.user.id, "fragment", self.request.get_full_path(), self.render_task_list
+        )
         context["page_header"] = f"Hi {self.request.user}"
         context["tasks_status_description"] = self.get_tasks_status_description()
+        context["search"] = self.request.GET.get("search", "")
         context["page_tabs"] = {
             tab.view_name: (tab.path if self.view_name != tab.view_name else None)
             for tab in [AllTaskView, PendingTaskView, CompletedTaskView]
@@ -141,38 +243,37 @@ class TaskFormViewMixin(AuthorizedTaskManager):
         context["task_form_operation"] = self.task_form_operation
         return context
 
-    def cascade_update_priorities(self, priority, task_id) -> int:
-        deltas = []
-        for task in self.get_queryset().filter(completed=False, priority__gte=priority).exclude(id=task_id):
-            if task.priority != priority:
-                break
-            task.priority = priority = priority + 1
-            deltas.append(task)
-        return Task.objects.bulk_update(deltas, ["priority"])
+    def save_cascading(self, form, cascade: bool) -> HttpResponse:
+        """
+        Saves the task once, after shifting the pending tasks out of its priority when `cascade` is set. Both happen
+        in one transaction, under a lock of the user's row that serializes concurrent cascades over the same task list.
+        """
+        task = form.instance
+        shifted = 0
+        with transaction.atomic():
+            if cascade:
+                User.objects.select_for_update().filter(id=self.request.user.id).first()
+                shifted = self.get_queryset().cascade_priorities(task.priority, task.id)
+            response = super().form_valid(form)
+        if shifted:
+            caching.invalidate(self.request.user.id)
+            events.publish(self.request.user.id, "refresh", {})
+        return response
 
 
 class TaskCreateView(TaskFormViewMixin, CreateView):
     task_form_operation = "Create"
 
     def form_valid(self, form) -> HttpResponse:
-        response = super().form_valid(form)
-        self.object.user = self.request.user
-        self.object.save()
-        if not self.object.completed:
-            self.cascade_update_priorities(self.object.priority, self.object.id)
-        return response
+        form.instance.user = self.request.user
+        return self.save_cascading(form, cascade=not form.instance.completed)
 
 
 class TaskUpdateView(TaskFormViewMixin, UpdateView):
     task_form_operation = "Update"
 
     def form_valid(self, form) -> HttpResponse:
-        response = super().form_valid(form)
-        if not form.has_changed():
-            return response
-        if not self.object.completed and ("priority" in form.changed_data):
-            self.cascade_update_priorities(self.object.priority, self.object.id)
-        return response
+        return self.save_cascading(form, cascade=not form.instance.completed and "priority" in form.changed_data)
 
 
 class GenericTaskDeleteView(AuthorizedTaskManager, DeleteView):
@@ -184,3 +285,13 @@ class GenericTaskDeleteView(AuthorizedTaskManager, DeleteView):
         context = super().get_context_data(**kwargs)
         context["page_header"] = "Delete Task?"
         return context
+
+
+class CacheMetricsView(View):
+    """Exposes the hit and miss counters of the task cache in the Prometheus text format, for scraping."""
+
+    def get(self, request):
+        lines = ["# TYPE task_cache_lookups_total counter"]
+        for (kind, result), count in sorted(caching.get_stats().items()):
+            lines.append(f'task_cache_lookups_total{{kind="{kind}",result="{result}"}} {count}')
+        return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4")
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.1 on 2026-10-18 10:40
+
+from django.db import migrations, OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute('CREATE VIRTUAL TABLE tasks_task_fts USING fts5(title, description)')
+    except OperationalError:  # SQLite built without FTS5, the in-process index is used instead.
+        return
+    schema_editor.execute(
+        'INSERT INTO tasks_task_fts (rowid, title, description) SELECT id, title, description FROM tasks_task'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS tasks_task_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tasks.models import Task
+from tasks.search import get_search_backend
+
+
+@receiver(post_save, sender=Task)
+def on_task_save_index(sender, instance: Task, **kwargs) -> None:
+    """
+    Invoked whenever a Task is saved, to keep its search index entry in sync with its title and description.
+    """
+    get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Task)
+def on_task_delete_index(sender, instance: Task, **kwargs) -> None:
+    """
+    Invoked whenever a Task is deleted, to drop its search index entry.
+    """
+    get_search_backend().remove(instance.id)
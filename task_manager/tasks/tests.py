@@ -1,3 +1,47 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from tasks.models import Task
+from tasks.search import FTS5SearchBackend, InvertedIndexSearchBackend, get_search_backend
+
+
+class TaskSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tester", password="password")
+        for title, description in [
+            ("Buy groceries", "Milk and bread"),
+            ("Write report", "Quarterly groceries budget"),
+            ("Call plumber", "Kitchen sink"),
+        ]:
+            Task.objects.create(title=title, description=description, user=self.user)
+        self.client.login(username="tester", password="password")
+
+    def search(self, query):
+        return [task.title for task in self.client.get("/tasks/", {"search": query}).context["tasks"]]
+
+    def test_matches_title_and_description_by_prefix_ranked_by_relevance(self):
+        self.assertEqual(self.search("grocer"), ["Buy groceries", "Write report"])
+        self.assertEqual(self.search("kitchen plumb"), ["Call plumber"])
+        self.assertEqual(len(self.search("")), 3)
+
+    def test_index_follows_writes(self):
+        task = Task.objects.get(title="Call plumber")
+        task.title = "Call electrician"
+        task.save()
+        self.assertEqual(self.search("electric"), ["Call electrician"])
+        task.delete()
+        self.assertEqual(self.search("electric"), [])
+
+    def test_uses_fts5_where_available(self):
+        if not FTS5SearchBackend.is_available():
+            self.skipTest("The database has no FTS5 table.")
+        self.assertIsInstance(get_search_backend(), FTS5SearchBackend)
+
+    def test_backends_agree(self):
+        backend = InvertedIndexSearchBackend()
+        for query in ["grocer", "kitchen plumb", "milk report"]:
+            with self.subTest(query=query):
+                self.assertEqual(
+                    list(backend.search(Task.objects.all(), query).order_by("search_rank", "id")),
+                    list(get_search_backend().search(Task.objects.all(), query).order_by("search_rank", "id")),
+                )
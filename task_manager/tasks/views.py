@@ -13,6 +13,14 @@ from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
 from tasks.models import Task
+from tasks.search import get_search_backend, tokenize
+
+
+def search_tasks(tasks, search_term):
+    """Filters `tasks` down to those with every word of `search_term` in their title or description, best first."""
+    if not search_term or not tokenize(search_term):
+        return tasks
+    return get_search_backend().search(tasks, search_term).order_by("search_rank", "id")
 
 
 class AuthorizedTaskManager(LoginRequiredMixin):
@@ -92,18 +100,13 @@ class GenericTaskView(AuthorizedTaskManager, ListView):
             deleted=False,
             user=self.request.user,
         )
-        search_term = self.request.GET.get("search")
-        if search_term:
-            tasks = tasks.filter(title__icontains=search_term)
-        return tasks
+        return search_tasks(tasks, self.request.GET.get("search"))
 
 
 class TaskView(View):
     def get(self, request: HttpRequest):
         search_term = request.GET.get("search")
-        tasks = Task.objects.filter(deleted=False)
-        if search_term:
-            tasks = tasks.filter(title__icontains=search_term)
+        tasks = search_tasks(Task.objects.filter(deleted=False), search_term)
         return render(request, "tasks.html", {"tasks": tasks})
 
 
@@ -119,10 +122,7 @@ class CreateTaskView(View):
 
 def tasks_view(request: HttpRequest):
     search_term = request.GET.get("search")
-    tasks = Task.objects.filter(deleted=False)
-
-    if search_term:
-        tasks = tasks.filter(title__icontains=search_term)
+    tasks = search_tasks(Task.objects.filter(deleted=False), search_term)
 
     return render(request, "tasks.html", {"tasks": tasks})
 